@@ -1,12 +1,19 @@
 """
 Flask API服务
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from typing import Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import inspect
 import logging
 import os
+import threading
 from functools import wraps
+from pathlib import Path
 
 from strategy import FibonacciPyramidStrategy
 from xt_trader import XTTraderClient
@@ -21,13 +28,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson未安装，使用Flask默认JSON序列化")
+
+
+class OrjsonProvider(JSONProvider):
+    """基于 orjson 的 JSON 序列化（支持 numpy 类型和非字符串键）"""
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        """orjson 不直接支持的类型（如 float 子类）转换为基础类型"""
+        if isinstance(obj, float):
+            return float(obj)
+        if isinstance(obj, int):
+            return int(obj)
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(
+            obj,
+            default=self._default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
+# 首页在导入时读入内存并计算 ETag，避免每次请求都 stat/打开文件（DEBUG 模式下仍从磁盘读取，便于修改前端）
+try:
+    INDEX_HTML: Optional[bytes] = Path(app.static_folder, 'index.html').read_bytes()
+    INDEX_ETAG: Optional[str] = hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest()
+except OSError as e:
+    logger.warning(f"读取首页失败: {e}")
+    INDEX_HTML = INDEX_ETAG = None
+
 # 初始化策略、交易客户端和存储
+# baostock 在首次分析时登录，之后一直复用该会话，进程退出时自动登出（见 utils.baostock_session）
 strategy = FibonacciPyramidStrategy()
 trader: Optional[XTTraderClient] = None
-storage = OrderStorage()
+_trader_lock = threading.Lock()
+storage = OrderStorage(config.DATA_DIR)
+
+
+class APIError(Exception):
+    """路由中可直接抛出的业务错误，由 handle_exceptions 转换为对应状态码的错误响应（不记录堆栈）"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
 
 
 # 辅助函数
@@ -67,9 +125,65 @@ def error_response(message: str, status_code: int = 400) -> Tuple[Dict[str, Any]
     }), status_code
 
 
+def query_int(name: str, default: int, lo: Optional[int] = None, hi: Optional[int] = None) -> int:
+    """
+    读取整数查询参数
+
+    Args:
+        name: 参数名
+        default: 缺失、格式错误或越界时返回的默认值
+        lo: 允许的最小值（含）
+        hi: 允许的最大值（含）
+
+    Returns:
+        参数值
+    """
+    value = request.args.get(name, '').strip()
+    digits = value[1:] if value[:1] == '-' else value
+    if not (digits.isascii() and digits.isdigit()):
+        return default
+
+    number = int(value)
+    if (lo is not None and number < lo) or (hi is not None and number > hi):
+        return default
+    return number
+
+
+def _exception_response(func, e: Exception) -> Tuple[Dict[str, Any], int]:
+    """
+    将路由中抛出的异常转换为错误响应（需在 except 块中调用）
+
+    Args:
+        func: 抛出异常的路由函数
+        e: 异常对象
+
+    Returns:
+        (响应字典, HTTP状态码)
+    """
+    # 4xx 为预期内的客户端错误，只记一行日志，不收集堆栈
+    if isinstance(e, APIError):
+        logger.info(f"{func.__name__}: {e.status_code} - {e.message}")
+        return error_response(e.message, e.status_code)
+
+    if isinstance(e, HTTPException):  # 如 request.json 解析失败的 400/415
+        logger.warning(f"{func.__name__}: {e.code} - {e.description}")
+        return error_response(e.description, e.code)
+
+    if isinstance(e, ValueError):
+        logger.warning(f"{func.__name__}: 参数错误 - {e}")
+        return error_response(str(e), 400)
+
+    if isinstance(e, (KeyError, TypeError)):
+        logger.warning(f"{func.__name__}: 参数错误 - {e!r}")
+        return error_response(f'参数错误: {e}', 400)
+
+    logger.error(f"{func.__name__}: 处理失败 - {e}", exc_info=True)
+    return error_response(str(e), 500)
+
+
 def handle_exceptions(func):
     """
-    异常处理装饰器
+    异常处理装饰器，同时支持同步和 async 路由
 
     Args:
         func: 被装饰的函数
@@ -77,16 +191,21 @@ def handle_exceptions(func):
     Returns:
         装饰后的函数
     """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                return _exception_response(func, e)
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except ValueError as e:
-            logger.warning(f"{func.__name__}: 参数错误 - {e}")
-            return error_response(str(e), 400)
         except Exception as e:
-            logger.error(f"{func.__name__}: 处理失败 - {e}", exc_info=True)
-            return error_response(str(e), 500)
+            return _exception_response(func, e)
     return wrapper
 
 
@@ -94,32 +213,57 @@ def ensure_trader_connected() -> Tuple[bool, Optional[str]]:
     """
     确保交易客户端已连接
 
+    客户端在进程内只创建一次；连接断开时复用已有的客户端重连，
+    而不是重新创建 XtQuantTrader（新会话和新的交易线程）。
+
     Returns:
         (是否成功, 错误消息)
     """
     global trader
-    
-    if trader is None or not trader.is_connected:
+
+    with _trader_lock:
+        if trader is not None and trader.is_connected:
+            return True, None
+
         try:
-            trader = XTTraderClient(config.XT_ACCOUNT_PATH, config.XT_ACCOUNT_ID)
-            if not trader.connect():
+            if trader is None:
+                trader = XTTraderClient(
+                    config.XT_ACCOUNT_PATH,
+                    config.XT_ACCOUNT_ID,
+                    cpu_affinity=config.XT_CPU_AFFINITY
+                )
+                connected = trader.connect()
+            else:
+                connected = trader.reconnect()
+
+            if not connected:
                 return False, 'XTTrader连接失败'
         except Exception as e:
             logger.error(f"初始化交易客户端失败: {e}", exc_info=True)
             return False, f'初始化交易客户端失败: {str(e)}'
-    
+
     return True, None
 
 
 @app.route('/')
 def index():
     """首页"""
-    return send_from_directory(app.static_folder, 'index.html')
+    if INDEX_HTML is None or config.DEBUG:
+        return send_from_directory(app.static_folder, 'index.html')
+
+    if request.if_none_match.contains(INDEX_ETAG):
+        return Response(status=304, headers={'ETag': f'"{INDEX_ETAG}"'})
+
+    return Response(
+        INDEX_HTML,
+        mimetype='text/html',
+        headers={'ETag': f'"{INDEX_ETAG}"', 'Cache-Control': 'public, max-age=60'}
+    )
 
 
 @app.route('/api/analyze', methods=['POST'])
 @handle_exceptions
-def analyze_stock():
+async def analyze_stock():
     """
     分析股票并生成订单计划
 
@@ -153,29 +297,21 @@ def analyze_stock():
     stock_code = result
     logger.info(f"分析股票: {stock_code}, 总金额: {total_amount}")
 
-    try:
-        # 生成订单计划
-        result = strategy.generate_pyramid_orders(stock_code, total_amount)
-
-        # 保存订单记录
-        order_id = storage.save_order(result)
-        result['order_id'] = order_id
+    # 生成订单计划（baostock 网络请求，放到线程中等待）
+    result = await asyncio.to_thread(strategy.generate_pyramid_orders, stock_code, total_amount)
 
-        logger.info(f"订单已保存，ID: {order_id}")
+    # 保存订单记录
+    order_id = await asyncio.to_thread(storage.save_order, result)
+    result['order_id'] = order_id
 
-        return success_response(result)
+    logger.info(f"订单已保存，ID: {order_id}")
 
-    finally:
-        # 确保登出baostock
-        try:
-            strategy.logout_baostock()
-        except Exception as e:
-            logger.warning(f"登出baostock失败: {e}")
+    return success_response(result)
 
 
 @app.route('/api/execute', methods=['POST'])
 @handle_exceptions
-def execute_orders():
+async def execute_orders():
     """
     执行订单
 
@@ -202,7 +338,7 @@ def execute_orders():
     logger.info(f"执行订单: {stock_code}, 订单数量: {len(orders)}")
 
     # 确保交易客户端已连接
-    connected, error_msg = ensure_trader_connected()
+    connected, error_msg = await asyncio.to_thread(ensure_trader_connected)
     if not connected:
         return error_response(error_msg, 500)
 
@@ -222,22 +358,23 @@ def execute_orders():
     if not order_list:
         return error_response('没有有效的订单', 400)
 
-    # 批量下单
-    results = trader.batch_place_orders(order_list)
+    # 批量下单（实盘模式下多个订单在下单线程池中并行提交），等待期间不阻塞事件循环
+    results = await trader.batch_place_orders_async(order_list)
 
     # 统计结果
-    success_count = sum(1 for r in results if r['success'])
+    success_count = sum(1 for r in results if r.success)
     fail_count = len(results) - success_count
 
     return success_response({
         'total': len(results),
         'success': success_count,
         'failed': fail_count,
-        'results': results
+        'results': [r.as_dict() for r in results]
     })
 
 
 @app.route('/api/health', methods=['GET'])
+@handle_exceptions
 def health_check():
     """健康检查"""
     return success_response({
@@ -256,14 +393,7 @@ def get_order_history():
     - limit: 返回数量（默认10）
     - stock_code: 筛选特定股票
     """
-    try:
-        limit = int(request.args.get('limit', 10))
-    except (ValueError, TypeError):
-        limit = 10
-
-    if limit < 1 or limit > 100:
-        limit = 10
-
+    limit = query_int('limit', 10, lo=1, hi=100)
     stock_code = request.args.get('stock_code', '').strip()
 
     # 获取订单
@@ -298,7 +428,7 @@ def get_order_detail(order_id: str):
     order = storage.get_order_by_id(order_id)
 
     if order is None:
-        return error_response('订单不存在', 404)
+        raise APIError(404, '订单不存在')
 
     return success_response(order)
 
@@ -315,7 +445,7 @@ def delete_order(order_id: str):
     success = storage.delete_order(order_id)
 
     if not success:
-        return error_response('订单不存在', 404)
+        raise APIError(404, '订单不存在')
 
     return success_response(message='订单已删除')
 
@@ -1,9 +1,17 @@
 # 配置文件
+import os
 
 ## 服务配置
 HOST = '0.0.0.0'
 PORT = 5000
-DEBUG = True
+# 调试模式（Werkzeug 重载器 + 交互式调试器）默认关闭，仅在 FLASK_DEBUG=1 时开启
+DEBUG = os.environ.get('FLASK_DEBUG', '0') == '1'
+
+## 存储配置
+# 订单记录目录：默认为项目根目录下的 data/（docker-compose 挂载到 /app/data 的卷），
+# 按本文件的位置解析，与启动时的工作目录（gunicorn 会切换到 backend/）无关；可用 SNAPBACK_DATA_DIR 覆盖
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.abspath(os.environ.get('SNAPBACK_DATA_DIR', os.path.join(PROJECT_ROOT, 'data')))
 
 ## 策略配置
 # 查找涨停的时间范围（天）
@@ -38,6 +46,11 @@ MOCK_MODE = True
 XT_ACCOUNT_ID = '090000014536'
 XT_ACCOUNT_PATH = 'D:\\华宝证券QMT实盘交易端 - yh\\userdata_mini'
 
+# 连接时把进程（及随后启动的 xtquant 线程）绑定到这些 CPU 核上，如 XT_CPU_AFFINITY=0,1；为空时不绑定
+XT_CPU_AFFINITY = {
+    int(cpu) for cpu in os.environ.get('XT_CPU_AFFINITY', '').split(',') if cpu.strip()
+} or None
+
 ## 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
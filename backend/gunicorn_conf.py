@@ -0,0 +1,31 @@
+"""
+Gunicorn 生产环境配置
+
+启动方式（在项目根目录执行）:
+    gunicorn -c backend/gunicorn_conf.py app:app
+"""
+import multiprocessing
+import os
+
+# 切换到 backend 目录：app.py 使用平级导入（订单目录按 config.DATA_DIR 的绝对路径解析，不受影响）
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# gthread：每个进程多个线程，baostock / XTTrader 的阻塞调用可以并行
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 5))
+
+# 在主进程中导入应用，worker 以写时复制方式共享 strategy / storage
+# XTTrader 客户端在 ensure_trader_connected() 中按需创建，不会在主进程中建立连接
+# 每个 worker 各自持有一个交易会话（会话编号由时间戳和进程号生成，互不冲突）；
+# 实盘交易不希望同一账户同时存在多个会话时，设置 WEB_CONCURRENCY=1 只运行一个 worker
+preload_app = True
+
+# 定期回收 worker，防止内存缓慢增长
+max_requests = 1000
+max_requests_jitter = 50
+
+# /api/analyze 需要等待 baostock 网络请求
+timeout = 120
@@ -0,0 +1,109 @@
+"""
+订单计划磁盘缓存 - 按 (股票代码, 总金额, 交易日) 缓存 generate_pyramid_orders 的结果
+
+同一交易日内重复分析同一股票、同一金额时直接读取本地 JSON 文件，不再访问 baostock。
+每个键对应 cache_dir 下的一个文件（文件名为键的 MD5），写入时先写临时文件再原子替换；
+超过 TTL（默认1天，按文件修改时间计算）或损坏的文件视为未命中。
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson未安装，使用标准库json读写订单缓存")
+
+# 默认缓存目录和有效期（秒）：行情每个交易日收盘一次，缓存一天
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'orders')
+DEFAULT_TTL = 24 * 3600
+
+
+class FileCache:
+    """基于 JSON 文件的 TTL 缓存"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录（不存在时在首次写入时创建）
+            ttl: 有效期（秒）
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(stock_code: str, total_amount: float, date: Optional[datetime] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            stock_code: 股票代码
+            total_amount: 总投资金额
+            date: 交易日，默认为今天
+
+        Returns:
+            缓存键，如 sh.600000_100000.0_20260115
+        """
+        date = date or datetime.now()
+        return f"{stock_code}_{float(total_amount)}_{date:%Y%m%d}"
+
+    def _path(self, key: str) -> str:
+        """缓存键对应的文件路径"""
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.json')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的数据（每次读取都是新对象，可以修改），未命中、已过期或文件损坏时返回None
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            return orjson.loads(data) if orjson is not None else json.loads(data)
+        except ValueError:
+            logger.warning(f"订单缓存文件损坏，已忽略: {path}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        写入缓存（写入失败只记录日志，不影响调用方）
+
+        Args:
+            key: 缓存键
+            value: 可 JSON 序列化的数据
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if orjson is not None:
+                payload = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+            else:
+                payload = json.dumps(value, ensure_ascii=False).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"写入订单缓存失败: {e}")
@@ -7,25 +7,27 @@ import threading
 import time
 from datetime import datetime, timedelta
 from typing import Optional
-try:
-    from backend.utils import (
-        is_trading_day, get_market_close_time, get_market_open_time,
-        is_trading_time
-    )
-    from backend.xt_trader import XTTraderClient
-except ImportError:
-    # 如果相对导入失败，尝试绝对导入
-    import sys
-    import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from backend.utils import (
-        is_trading_day, get_market_close_time, get_market_open_time,
-        is_trading_time
-    )
-    from backend.xt_trader import XTTraderClient
+import os
+import sys
+
+# 与 app.py / strategy.py 一样按平级模块导入 utils 和 xt_trader：同一个模块只加载一次，
+# 进程内只有一个 baostock 会话（按 backend.utils 导入会得到另一个模块对象和另一把锁）
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
+
+from utils import (
+    is_trading_day, get_market_close_time, get_market_open_time,
+    is_trading_time, get_next_trading_day
+)
+from xt_trader import XTTraderClient
 
 logger = logging.getLogger(__name__)
 
+# 两次唤醒之间的最短/最长等待（秒）。设置上限是为了在系统时间被调整后也能及时校正
+MIN_WAIT_SECONDS = 1
+MAX_WAIT_SECONDS = 3600
+
 
 class OrderScheduler:
     """订单定时任务调度器"""
@@ -36,12 +38,13 @@ class OrderScheduler:
         
         Args:
             trader: XTTraderClient实例
-            check_interval: 检查间隔（秒），默认60秒
+            check_interval: 处于检查/重新下单时间窗口内时的检查间隔（秒），默认60秒
         """
         self.trader = trader
         self.check_interval = check_interval
         self.running = False
         self.thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
         self._last_check_time = None
         self._last_reload_time = None
         self.pending_orders_file = "pending_orders.json"
@@ -53,6 +56,7 @@ class OrderScheduler:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
         logger.info("订单调度器已启动")
@@ -60,13 +64,14 @@ class OrderScheduler:
     def stop(self):
         """停止调度器"""
         self.running = False
+        self._stop_event.set()  # 立即唤醒等待中的调度线程
         if self.thread:
             self.thread.join(timeout=5)
         logger.info("订单调度器已停止")
     
     def _run(self):
-        """调度器主循环"""
-        while self.running:
+        """调度器主循环：处理当前时间点的任务后，一直等待到下一个时间点"""
+        while not self._stop_event.is_set():
             try:
                 now = datetime.now()
                 
@@ -78,12 +83,55 @@ class OrderScheduler:
                     # 检查是否需要重新下单（开盘后3分钟）
                     self._reload_pending_orders(now)
                 
-                # 等待指定间隔后再次检查
-                time.sleep(self.check_interval)
+                timeout = self._seconds_until_next_event(datetime.now())
                 
             except Exception as e:
                 logger.error(f"调度器运行异常: {e}", exc_info=True)
-                time.sleep(self.check_interval)
+                timeout = self.check_interval
+            
+            # Event.wait 基于单调时钟计时，stop() 时会被立即唤醒
+            self._stop_event.wait(timeout)
+    
+    def _seconds_until_next_event(self, now: datetime) -> float:
+        """
+        计算距离下一个需要处理的时间点的秒数
+
+        时间点包括：开盘后3分钟（重新下单）、收盘前3分钟（检查未成交订单）；
+        处于时间窗口内时按 check_interval 轮询；当天已无任务时等到下一个交易日开盘后3分钟。
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            等待秒数
+        """
+        interval = timedelta(seconds=self.check_interval)
+        candidates = []
+        
+        if is_trading_day(now):
+            open_time = get_market_open_time(now)
+            close_time = get_market_close_time(now)
+            reload_time = open_time + timedelta(minutes=3)
+            check_time = close_time - timedelta(minutes=3)
+            
+            if now < reload_time:
+                candidates.append(reload_time)
+            elif (now <= open_time + timedelta(minutes=10) and
+                  (self._last_reload_time is None or
+                   self._last_reload_time.date() != now.date())):
+                candidates.append(now + interval)
+            
+            if now < check_time:
+                candidates.append(check_time)
+            elif now <= close_time:
+                candidates.append(now + interval)
+        
+        if not candidates:
+            next_day = get_next_trading_day(now)
+            candidates.append(get_market_open_time(next_day) + timedelta(minutes=3))
+        
+        seconds = (min(candidates) - now).total_seconds()
+        return min(max(seconds, MIN_WAIT_SECONDS), MAX_WAIT_SECONDS)
     
     def _check_pending_orders(self, now: datetime):
         """
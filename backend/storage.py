@@ -1,10 +1,40 @@
 """
 数据存储模块 - 用于保存订单历史记录
+
+订单以 JSON Lines 追加日志的形式保存（每行一条记录），
+删除操作追加墓碑行，墓碑累积到一定数量后再压缩重写整个文件。
+文件回放到内存索引后，查询都走索引；每次访问只 stat 一次文件，
+发现被其他进程（如 gunicorn 的其他 worker）修改过时才重新回放。
+多个进程的写入（追加和压缩重写）由旁路锁文件 orders.jsonl.lock 上的 flock 串行化。
 """
+import itertools
 import json
+import logging
 import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson未安装，使用标准库json序列化订单")
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，也不会以多进程 gunicorn 运行
+    fcntl = None
+
+# 墓碑数量达到该值且不少于有效记录数时触发压缩
+COMPACT_MIN_TOMBSTONES = 100
 
 
 class OrderStorage:
@@ -18,16 +48,174 @@ class OrderStorage:
             storage_dir: 存储目录
         """
         self.storage_dir = storage_dir
-        self.orders_file = os.path.join(storage_dir, 'orders.json')
+        self.orders_file = os.path.join(storage_dir, 'orders.jsonl')
+        self.legacy_orders_file = os.path.join(storage_dir, 'orders.json')
+        self.lock_file = os.path.join(storage_dir, 'orders.jsonl.lock')
+
+        # 内存索引，由 _lock 保护（Flask 多线程下并发读写）
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict] = {}  # 保持写入顺序
+        self._by_stock: Dict[str, Dict[str, Dict]] = defaultdict(dict)  # stock_code -> {order_id: 记录}
+        self._tombstones = 0
+        self._total_amount = 0  # 所有有效订单 total_amount 之和，随写入增量维护
+        self._file_sig: Optional[Tuple[int, int, int]] = None  # 索引对应的文件状态
+        self._id_counter = itertools.count(int(time.time()))  # 同一纳秒内的订单ID去重
+
         self.ensure_storage_dir()
+        self._load()
 
     def ensure_storage_dir(self):
         """确保存储目录存在"""
         os.makedirs(self.storage_dir, exist_ok=True)
 
+        with self._file_lock():
+            if not os.path.exists(self.orders_file):
+                self._migrate_legacy_orders()
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        持有跨进程的写锁（锁文件上的 flock），期间其他进程不会追加或重写日志
+
+        读取不加锁：追加是整行写入，重写通过 os.replace 原子替换。没有 fcntl 时只有进程内的 _lock。
+        """
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _migrate_legacy_orders(self):
+        """将旧版 orders.json（整体JSON数组）一次性转换为 JSONL 日志，旧文件保留作备份"""
+        records = []
+        if os.path.exists(self.legacy_orders_file):
+            with open(self.legacy_orders_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            logger.info(f"迁移旧版订单文件 {self.legacy_orders_file}，共 {len(records)} 条")
+
+        self._rewrite(records)
+
+    @staticmethod
+    def _json_default(obj: Any) -> Any:
+        """orjson 不直接支持的类型（如 float 子类）转换为基础类型"""
+        if isinstance(obj, float):
+            return float(obj)
+        if isinstance(obj, int):
+            return int(obj)
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+    @classmethod
+    def _encode(cls, entry: Dict) -> bytes:
+        """序列化为一行紧凑的 UTF-8 JSON"""
+        if orjson is not None:
+            return orjson.dumps(
+                entry,
+                default=cls._json_default,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+            )
+        return (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        """文件状态签名 (inode, mtime_ns, size)，文件不存在时返回None"""
+        try:
+            st = os.stat(self.orders_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _append(self, entry: Dict):
+        """向日志末尾追加一行（调用方需持有 _file_lock），并在没有其他写入者插入时推进索引的文件签名"""
+        data = self._encode(entry)
+        with open(self.orders_file, 'ab') as f:
+            f.write(data)
+
+        old_sig, new_sig = self._file_sig, self._stat_signature()
+        if old_sig and new_sig and new_sig[2] == old_sig[2] + len(data):
+            self._file_sig = new_sig
+        else:
+            # 期间有其他进程写入，下次访问时重新回放
+            self._file_sig = None
+
+    def _rewrite(self, records: List[Dict]):
+        """
+        原子地重写整个日志文件（仅用于迁移和压缩，调用方需持有 _file_lock，
+        并在持锁后用 _refresh 读入其他进程的最新写入）
+
+        先写入同目录下本进程独有的临时文件，再替换原文件。
+        """
+        fd, tmp_file = tempfile.mkstemp(dir=self.storage_dir, prefix='orders.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.writelines(self._encode(record) for record in records)
+            os.replace(tmp_file, self.orders_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            raise
+        self._file_sig = self._stat_signature()
+
+    def _iter_log(self) -> Iterator[Dict]:
+        """逐行读取日志，跳过空行和写入中断导致的残缺行"""
         if not os.path.exists(self.orders_file):
-            with open(self.orders_file, 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False)
+            return
+
+        loads = orjson.loads if orjson is not None else json.loads
+        with open(self.orders_file, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError:  # json / orjson 的 JSONDecodeError 均为其子类
+                    logger.warning(f"订单日志第 {line_no} 行损坏，已跳过")
+
+    def _replay(self) -> Tuple[Dict[str, Dict], int]:
+        """
+        回放日志
+
+        Returns:
+            (按写入顺序排列的 {order_id: 记录}, 墓碑数量)
+        """
+        records: Dict[str, Dict] = {}
+        tombstones = 0
+
+        for entry in self._iter_log():
+            if 'deleted' in entry:
+                records.pop(entry['deleted'], None)
+                tombstones += 1
+            else:
+                records[entry['order_id']] = entry
+
+        return records, tombstones
+
+    def _load(self):
+        """回放日志并重建内存索引"""
+        with self._lock:
+            # 先取签名再读取：读取期间的并发写入会在下次访问时触发重新加载
+            self._file_sig = self._stat_signature()
+            records, tombstones = self._replay()
+
+            self._by_id = records
+            self._by_stock = defaultdict(dict)
+            for order_id, record in records.items():
+                self._by_stock[record['data'].get('stock_code', '')][order_id] = record
+            self._tombstones = tombstones
+            self._total_amount = sum(
+                record['data'].get('total_amount', 0) for record in records.values()
+            )
+
+    def _refresh(self):
+        """文件被其他进程修改过时重新加载索引（调用方需持有 _lock）"""
+        if self._stat_signature() != self._file_sig:
+            self._load()
 
     def save_order(self, order_data: Dict) -> str:
         """
@@ -39,7 +227,8 @@ class OrderStorage:
         Returns:
             订单ID
         """
-        order_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        # 纳秒时间戳 + 进程内递增计数：并发保存也不会重复，且按写入顺序递增
+        order_id = f"{time.time_ns():020d}{next(self._id_counter):08x}"
 
         record = {
             'order_id': order_id,
@@ -47,13 +236,13 @@ class OrderStorage:
             'data': order_data
         }
 
-        # 读取现有订单
-        orders = self.load_all_orders()
-        orders.append(record)
-
-        # 保存
-        with open(self.orders_file, 'w', encoding='utf-8') as f:
-            json.dump(orders, f, ensure_ascii=False, indent=2)
+        # 持有跨进程写锁后再刷新索引：其他进程不会在刷新和追加之间重写日志
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._append(record)
+            self._by_id[order_id] = record
+            self._by_stock[order_data.get('stock_code', '')][order_id] = record
+            self._total_amount += order_data.get('total_amount', 0)
 
         return order_id
 
@@ -64,11 +253,9 @@ class OrderStorage:
         Returns:
             订单列表
         """
-        if not os.path.exists(self.orders_file):
-            return []
-
-        with open(self.orders_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with self._lock:
+            self._refresh()
+            return list(self._by_id.values())
 
     def get_order_by_id(self, order_id: str) -> Optional[Dict]:
         """
@@ -80,11 +267,9 @@ class OrderStorage:
         Returns:
             订单记录或None
         """
-        orders = self.load_all_orders()
-        for order in orders:
-            if order['order_id'] == order_id:
-                return order
-        return None
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(order_id)
 
     def get_orders_by_stock(self, stock_code: str) -> List[Dict]:
         """
@@ -96,11 +281,9 @@ class OrderStorage:
         Returns:
             订单列表
         """
-        orders = self.load_all_orders()
-        return [
-            order for order in orders
-            if order['data'].get('stock_code') == stock_code
-        ]
+        with self._lock:
+            self._refresh()
+            return list(self._by_stock.get(stock_code, {}).values())
 
     def get_recent_orders(self, limit: int = 10) -> List[Dict]:
         """
@@ -112,12 +295,14 @@ class OrderStorage:
         Returns:
             订单列表
         """
-        orders = self.load_all_orders()
-        return orders[-limit:][::-1]  # 倒序返回最近的
+        with self._lock:
+            self._refresh()
+            # 倒序返回最近的
+            return list(islice(reversed(self._by_id.values()), limit))
 
     def delete_order(self, order_id: str) -> bool:
         """
-        删除订单记录
+        删除订单记录（追加墓碑，墓碑过多时压缩日志）
 
         Args:
             order_id: 订单ID
@@ -125,51 +310,57 @@ class OrderStorage:
         Returns:
             是否成功
         """
-        orders = self.load_all_orders()
-        new_orders = [o for o in orders if o['order_id'] != order_id]
-
-        if len(new_orders) == len(orders):
-            return False
-
-        with open(self.orders_file, 'w', encoding='utf-8') as f:
-            json.dump(new_orders, f, ensure_ascii=False, indent=2)
+        # 持锁期间其他进程无法写入，压缩时刷新得到的索引就是日志的最新内容，重写不会丢失其他进程的追加
+        with self._lock, self._file_lock():
+            self._refresh()
+            record = self._by_id.pop(order_id, None)
+            if record is None:
+                return False
+
+            stock_code = record['data'].get('stock_code', '')
+            del self._by_stock[stock_code][order_id]
+            if not self._by_stock[stock_code]:
+                del self._by_stock[stock_code]
+            self._total_amount = (
+                self._total_amount - record['data'].get('total_amount', 0) if self._by_id else 0
+            )
+
+            self._tombstones += 1
+            if self._tombstones >= max(COMPACT_MIN_TOMBSTONES, len(self._by_id)):
+                self._rewrite(list(self._by_id.values()))
+                self._tombstones = 0
+            else:
+                self._append({'deleted': order_id})
 
         return True
 
     def get_statistics(self) -> Dict:
         """
-        获取统计信息
+        获取统计信息（由内存索引和增量维护的汇总值直接得出，不遍历订单）
 
         Returns:
             统计数据
         """
-        orders = self.load_all_orders()
+        with self._lock:
+            self._refresh()
+
+            if not self._by_id:
+                return {
+                    'total_orders': 0,
+                    'total_stocks': 0,
+                    'total_amount': 0,
+                    'first_order_date': None,
+                    'last_order_date': None
+                }
 
-        if not orders:
             return {
-                'total_orders': 0,
-                'total_stocks': 0,
-                'total_amount': 0,
-                'first_order_date': None,
-                'last_order_date': None
+                'total_orders': len(self._by_id),
+                'total_stocks': len(self._by_stock),
+                'total_amount': self._total_amount,
+                'first_order_date': next(iter(self._by_id.values()))['timestamp'],
+                'last_order_date': next(reversed(self._by_id.values()))['timestamp']
             }
 
-        stocks = set()
-        total_amount = 0
-
-        for order in orders:
-            data = order['data']
-            stocks.add(data.get('stock_code', ''))
-            total_amount += data.get('total_amount', 0)
-
-        return {
-            'total_orders': len(orders),
-            'total_stocks': len(stocks),
-            'total_amount': total_amount,
-            'first_order_date': orders[0]['timestamp'],
-            'last_order_date': orders[-1]['timestamp']
-        }
-
 
 if __name__ == '__main__':
     # 测试代码
@@ -196,6 +387,9 @@ if __name__ == '__main__':
     stats = storage.get_statistics()
     print(f"\n统计信息: {stats}")
 
+    # 测试删除订单
+    print(f"\n删除订单: {storage.delete_order(order_id)}")
+
     # 清理测试数据
     import shutil
     shutil.rmtree('test_data')
@@ -1,102 +1,250 @@
 """
 斐波那契回调金字塔建仓策略
 """
+import copy
+import logging
+import threading
+
 import baostock as bs
-import pandas as pd
 import numpy as np
+from cachetools import TLRUCache
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+
+from utils import baostock_session, NUMBA_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+# K线查询缓存：同一股票、同一日期区间的结果在收盘前复用，最长缓存时间（秒）
+KLINE_CACHE_SIZE = 1024
+KLINE_CACHE_MAX_TTL = 3600
+
+# 订单计划缓存：同一股票、同一金额的计划在K线缓存有效期内复用
+PLAN_CACHE_SIZE = 256
+
+# 查询的K线字段，以及其中读取时即转换为 float64 数组的列
+KLINE_FIELDS = "date,code,open,high,low,close,preclose,volume,amount,pctChg"
+KLINE_NUMERIC_COLUMNS = ('pctChg', 'high', 'low', 'close', 'open')
+
+# 斐波那契回调比例及其在结果字典中的键名（顺序一一对应）
+FIB_LEVEL_NAMES = ('0.382', '0.500', '0.618', '0.700', '0.786')
+_FIB_COEFFS = np.array([0.382, 0.500, 0.618, 0.700, 0.786], dtype=np.float64)
+
+# 金字塔订单的固定信息：(阶段, 阶段内序号, 仓位占比, 描述)
+_ORDER_SLOTS = tuple(
+    [(1, i, 14.0, f'第一阶段第{i}单 (0.5-0.618回调区间)') for i in range(1, 6)]
+    + [(2, i, 10.0, f'第二阶段第{i}单 (0.618-0.7回调区间)') for i in range(1, 4)]
+)
+
+
+class KlineFetchError(Exception):
+    """baostock 返回错误、重新登录重试后仍无法取得K线"""
+
+
+# 涨停阈值（百分比）：涨幅接近10%，实际涨停可能略小于10%，这里使用9.5%
+LIMIT_UP_PCT = 9.5
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit
+
+    @njit(cache=True)
+    def _scan_limit_up(pct_chg, high, low, close, threshold):
+        """
+        从最新一天向前扫描，找到最近一次涨停，同时累计其后（含当天）的最高价和最低价
+
+        Returns:
+            (涨停位置, 最高价, 最低价, 最新收盘价)，没有涨停时位置为 -1
+        """
+        highest = -np.inf
+        lowest = np.inf
+        for i in range(pct_chg.shape[0] - 1, -1, -1):
+            if high[i] > highest:
+                highest = high[i]
+            if low[i] < lowest:
+                lowest = low[i]
+            if pct_chg[i] >= threshold:
+                return i, highest, lowest, close[-1]
+        return -1, highest, lowest, close[-1]
+else:
+    def _scan_limit_up(pct_chg, high, low, close, threshold):
+        """_scan_limit_up 的 numpy 实现（numba 未安装时使用）"""
+        positions = np.flatnonzero(pct_chg >= threshold)
+        if len(positions) == 0:
+            return -1, np.nan, np.nan, close[-1]
+        # baostock 按日期升序返回，最后一个满足条件的位置即最近一次涨停
+        i = positions[-1]
+        return i, high[i:].max(), low[i:].min(), close[-1]
+
+
+def _kline_ttu(key, value, now: float) -> float:
+    """K线缓存的过期时间：下一次收盘（15:00），且不超过 KLINE_CACHE_MAX_TTL"""
+    current = datetime.now()
+    market_close = current.replace(hour=15, minute=0, second=0, microsecond=0)
+    if current >= market_close:
+        market_close += timedelta(days=1)
+    return now + min((market_close - current).total_seconds(), KLINE_CACHE_MAX_TTL)
 
 
 class FibonacciPyramidStrategy:
     """斐波那契回调金字塔建仓策略"""
 
     def __init__(self):
-        self.is_logged_in = False
+        # baostock 会话由 utils.baostock_session 在进程内共享（与交易日历查询共用）
+        # (stock_code, start_date, end_date) -> {字段名: 列数据}，由 baostock_session.lock 保护
+        self._kline_cache = TLRUCache(maxsize=KLINE_CACHE_SIZE, ttu=_kline_ttu)
+        # (stock_code, total_amount) -> generate_pyramid_orders 的结果，与K线缓存同时过期，由 _plan_lock 保护
+        self._plan_cache = TLRUCache(maxsize=PLAN_CACHE_SIZE, ttu=_kline_ttu)
+        self._plan_lock = threading.Lock()
 
     def login_baostock(self):
-        """登录baostock"""
-        if not self.is_logged_in:
-            lg = bs.login()
-            if lg.error_code != '0':
-                raise Exception(f"baostock登录失败: {lg.error_msg}")
-            self.is_logged_in = True
+        """登录baostock（已登录时直接复用进程内共享的会话）"""
+        baostock_session.login()
 
     def logout_baostock(self):
-        """登出baostock"""
-        if self.is_logged_in:
-            bs.logout()
-            self.is_logged_in = False
+        """登出baostock（进程退出时会自动登出，一般无需调用）"""
+        baostock_session.logout()
 
-    def find_latest_limit_up(self, stock_code: str, days: int = 60) -> Optional[Dict]:
+    def _query_k_data(self, stock_code: str, start_date: str, end_date: str) -> Dict[str, Any]:
         """
-        查找最近的涨停日期
+        查询日K线数据，复用长连接；会话失效时重新登录并重试一次
 
-        Args:
-            stock_code: 股票代码 (如 sh.600000 或 sz.000001)
-            days: 往前查找的天数
+        结果按 (stock_code, start_date, end_date) 缓存，同一交易日内重复分析同一股票不再访问网络。
 
         Returns:
-            涨停日期信息字典，包含日期、最高价、最低价等
+            按列组织的数据 {字段名: 该列各行的值}：KLINE_NUMERIC_COLUMNS 为只读 float64 数组，
+            其余为字符串列表；数值缺失（如停牌）的行已剔除。调用方不应修改
         """
-        self.login_baostock()
-
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-        # 获取历史K线数据
-        rs = bs.query_history_k_data_plus(
-            stock_code,
-            "date,code,open,high,low,close,preclose,volume,amount,pctChg",
-            start_date=start_date,
-            end_date=end_date,
-            frequency="d",
-            adjustflag="3"  # 不复权
-        )
+        key = (stock_code, start_date, end_date)
+
+        with baostock_session.lock:
+            cached = self._kline_cache.get(key)
+            if cached is not None:
+                return cached
 
-        if rs.error_code != '0':
-            raise Exception(f"获取历史数据失败: {rs.error_msg}")
+            result = self._fetch_k_data(stock_code, start_date, end_date)
+            self._kline_cache[key] = result
+            return result
 
-        data_list = []
+    def preload_bulk(self, stock_codes: List[str], days: int = 60) -> Dict[str, Dict[str, Any]]:
+        """
+        一次性预取多只股票的日K线，写入K线缓存
+
+        baostock 没有多股票查询接口，这里在一次会话锁内依次查询尚未缓存的股票
+        （共用一次登录检查），之后 generate_pyramid_orders 直接命中缓存。单只股票查询失败
+        （KlineFetchError）时记录日志并跳过，由之后的正常分析流程报告错误；
+        登录失败等其他异常直接抛出。
+
+        Args:
+            stock_codes: 股票代码列表 (如 sh.600000)
+            days: 往前查询的天数，与 find_latest_limit_up 一致
+
+        Returns:
+            {股票代码: K线数据}，只包含预取成功的股票
+        """
+        start_date, end_date = self._date_range(days)
+        loaded = {}
+
+        with baostock_session.lock:
+            for stock_code in dict.fromkeys(stock_codes):
+                key = (stock_code, start_date, end_date)
+                kline = self._kline_cache.get(key)
+                if kline is None:
+                    try:
+                        kline = self._fetch_k_data(stock_code, start_date, end_date)
+                    except KlineFetchError as e:
+                        logger.warning("预取 %s 的K线失败: %s", stock_code, e)
+                        continue
+                    self._kline_cache[key] = kline
+                loaded[stock_code] = kline
+
+        return loaded
+
+    @staticmethod
+    def _date_range(days: int) -> Tuple[str, str]:
+        """从今天往前 days 天的查询日期区间 (start_date, end_date)"""
+        now = datetime.now()
+        return (now - timedelta(days=days)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _fetch_k_data(stock_code: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        从 baostock 查询日K线（不经过缓存，调用方需持有 baostock_session.lock），
+        会话失效时重新登录并重试一次；返回值同 _query_k_data
+        """
+        for attempt in range(2):
+            baostock_session.login()
+            rs = bs.query_history_k_data_plus(
+                stock_code,
+                KLINE_FIELDS,
+                start_date=start_date,
+                end_date=end_date,
+                frequency="d",
+                adjustflag="3"  # 不复权
+            )
+            if rs.error_code == '0':
+                break
+            # 长连接可能已被服务端断开，强制重新登录后再试
+            baostock_session.invalidate()
+        else:
+            raise KlineFetchError(f"获取历史数据失败: {rs.error_msg}")
+
+        # 读取结果集时直接按列收集，数值列当场转换为 float，之后无需再做类型转换
+        fields = rs.fields
+        numeric_positions = [i for i, name in enumerate(fields) if name in KLINE_NUMERIC_COLUMNS]
+        columns = [[] for _ in fields]
+        appenders = [column.append for column in columns]
         while rs.next():
-            data_list.append(rs.get_row_data())
+            row_data = rs.get_row_data()
+            try:
+                for i in numeric_positions:
+                    row_data[i] = float(row_data[i])
+            except ValueError:
+                continue  # 数值为空（停牌等）的行直接跳过
+            for append, value in zip(appenders, row_data):
+                append(value)
+
+        result = dict(zip(fields, columns))
+        for name in KLINE_NUMERIC_COLUMNS:
+            array = np.array(result[name], dtype=np.float64)
+            array.flags.writeable = False
+            result[name] = array
+        return result
 
-        df = pd.DataFrame(data_list, columns=rs.fields)
+    def find_latest_limit_up(self, stock_code: str, days: int = 60) -> Optional[Dict]:
+        """
+        查找最近的涨停日期
 
-        # 转换数据类型
-        df['pctChg'] = pd.to_numeric(df['pctChg'], errors='coerce')
-        df['high'] = pd.to_numeric(df['high'], errors='coerce')
-        df['low'] = pd.to_numeric(df['low'], errors='coerce')
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df['open'] = pd.to_numeric(df['open'], errors='coerce')
+        Args:
+            stock_code: 股票代码 (如 sh.600000 或 sz.000001)
+            days: 往前查找的天数
 
-        # 删除无效数据
-        df = df.dropna()
+        Returns:
+            涨停日期信息字典，包含日期、最高价、最低价等
+        """
+        start_date, end_date = self._date_range(days)
 
-        # 查找涨停（涨幅接近10%，ST股票是5%）
-        # 这里使用9.5%作为涨停阈值，因为实际涨停可能略小于10%
-        limit_up_df = df[df['pctChg'] >= 9.5].sort_values('date', ascending=False)
+        # 获取历史K线数据（数值列已是 float64 数组，无效行已剔除）
+        kline = self._query_k_data(stock_code, start_date, end_date)
+        close = kline['close']
 
-        if len(limit_up_df) == 0:
+        if len(close) == 0:
             return None
 
-        # 获取最近一次涨停
-        latest_limit_up = limit_up_df.iloc[0]
-        limit_up_date = latest_limit_up['date']
-
-        # 获取涨停后到现在的数据，用于计算最高点和最低点
-        limit_up_index = df[df['date'] == limit_up_date].index[0]
-        after_limit_df = df.iloc[limit_up_index:]
+        # 查找最近一次涨停（ST股票涨停为5%，不在此列），以及涨停后到现在的最高点和最低点
+        limit_up_index, highest_price, lowest_price, current_price = _scan_limit_up(
+            kline['pctChg'], kline['high'], kline['low'], close, LIMIT_UP_PCT
+        )
 
-        highest_price = after_limit_df['high'].max()
-        lowest_price = after_limit_df['low'].min()
+        if limit_up_index < 0:
+            return None
 
         return {
-            'limit_up_date': limit_up_date,
-            'limit_up_price': float(latest_limit_up['close']),
+            'limit_up_date': kline['date'][limit_up_index],
+            'limit_up_price': float(close[limit_up_index]),
             'highest_price': float(highest_price),
             'lowest_price': float(lowest_price),
-            'current_price': float(df.iloc[-1]['close']),
+            'current_price': float(current_price),
             'stock_code': stock_code
         }
 
@@ -111,15 +259,12 @@ class FibonacciPyramidStrategy:
         Returns:
             各个回调位的价格
         """
-        diff = high - low
+        return dict(zip(FIB_LEVEL_NAMES, self._fibonacci_prices(high, low).tolist()))
 
-        return {
-            '0.382': high - diff * 0.382,
-            '0.500': high - diff * 0.500,
-            '0.618': high - diff * 0.618,
-            '0.700': high - diff * 0.700,
-            '0.786': high - diff * 0.786,
-        }
+    @staticmethod
+    def _fibonacci_prices(high: float, low: float) -> np.ndarray:
+        """按 FIB_LEVEL_NAMES 的顺序计算各回调位价格"""
+        return high - (high - low) * _FIB_COEFFS
 
     def generate_pyramid_orders(
         self,
@@ -133,6 +278,9 @@ class FibonacciPyramidStrategy:
         - 0.5-0.618回调：分5次进7成仓（每次14%）
         - 0.618-0.7回调：分3次进3成仓（每次10%）
 
+        结果按 (stock_code, total_amount) 在进程内缓存，过期时间与K线缓存相同（下一次收盘，最长1小时）；
+        每次返回的都是独立的副本，调用方可以修改（如 /api/analyze 写入 order_id）。
+
         Args:
             stock_code: 股票代码
             total_amount: 总投资金额
@@ -140,6 +288,19 @@ class FibonacciPyramidStrategy:
         Returns:
             订单信息字典
         """
+        key = (stock_code, float(total_amount))
+        with self._plan_lock:
+            cached = self._plan_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        result = self._generate_pyramid_orders(stock_code, total_amount)
+        with self._plan_lock:
+            self._plan_cache[key] = result
+        return copy.deepcopy(result)
+
+    def _generate_pyramid_orders(self, stock_code: str, total_amount: float) -> Dict:
+        """生成金字塔建仓订单（不经过缓存），参数和返回值同 generate_pyramid_orders"""
         # 查找涨停信息
         limit_info = self.find_latest_limit_up(stock_code)
 
@@ -150,40 +311,32 @@ class FibonacciPyramidStrategy:
         low = limit_info['lowest_price']
 
         # 计算斐波那契回调位
-        fib_levels = self.calculate_fibonacci_levels(high, low)
+        levels = self._fibonacci_prices(high, low)
+        fib_levels = dict(zip(FIB_LEVEL_NAMES, levels.tolist()))
 
-        # 生成订单
-        orders = []
-
-        # 第一阶段：0.5-0.618回调，分5次进7成仓
+        # 第一阶段：0.5-0.618回调，分5次进7成仓；第二阶段：0.618-0.7回调，分3次进3成仓
         stage1_amount = total_amount * 0.7
-        stage1_per_order = stage1_amount / 5
-        price_range_1 = np.linspace(fib_levels['0.500'], fib_levels['0.618'], 5)
-
-        for i, price in enumerate(price_range_1):
-            orders.append({
-                'stage': 1,
-                'order_no': i + 1,
-                'price': round(price, 2),
-                'amount': round(stage1_per_order, 2),
-                'percentage': 14.0,
-                'description': f'第一阶段第{i+1}单 (0.5-0.618回调区间)'
-            })
-
-        # 第二阶段：0.618-0.7回调，分3次进3成仓
         stage2_amount = total_amount * 0.3
-        stage2_per_order = stage2_amount / 3
-        price_range_2 = np.linspace(fib_levels['0.618'], fib_levels['0.700'], 3)
-
-        for i, price in enumerate(price_range_2):
-            orders.append({
-                'stage': 2,
-                'order_no': i + 1,
-                'price': round(price, 2),
-                'amount': round(stage2_per_order, 2),
-                'percentage': 10.0,
-                'description': f'第二阶段第{i+1}单 (0.618-0.7回调区间)'
-            })
+
+        # 两个阶段的价格一次性拼接、取整，再与预先生成的订单元信息逐一组合
+        prices = np.round(np.concatenate([
+            np.linspace(levels[1], levels[2], 5),
+            np.linspace(levels[2], levels[3], 3)
+        ]), 2).tolist()
+        amounts = [round(stage1_amount / 5, 2)] * 5 + [round(stage2_amount / 3, 2)] * 3
+
+        orders = [
+            {
+                'stage': stage,
+                'order_no': order_no,
+                'price': price,
+                'amount': amount,
+                'percentage': percentage,
+                'description': description
+            }
+            for (stage, order_no, percentage, description), price, amount
+            in zip(_ORDER_SLOTS, prices, amounts)
+        ]
 
         return {
             'stock_code': stock_code,
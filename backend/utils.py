@@ -1,23 +1,98 @@
 """
 工具函数模块
 """
+from bisect import bisect_right
 from datetime import datetime, timedelta, time as dt_time
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
 import re
 import json
 import os
 import logging
+import tempfile
+import atexit
+import threading
+import time
+
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-# baostock 交易日缓存
-_trading_day_cache: Dict[str, bool] = {}
-_baostock_logged_in = False
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.info("numba未安装，批量计算使用numpy实现")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson未安装，使用标准库json读写待下单订单")
+
 
 
+class BaostockSession:
+    """
+    进程内共享的 baostock 会话
+
+    baostock 使用模块级的全局连接，同一进程内的登录和查询都需要在 lock 下串行执行。
+    首次登录后一直复用，进程退出时自动登出。
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.is_logged_in = False
+        self._atexit_registered = False
+
+    def login(self):
+        """登录baostock（已登录时直接复用会话），失败时抛出异常"""
+        with self.lock:
+            if self.is_logged_in:
+                return
+
+            import baostock as bs
+            lg = bs.login()
+            if lg.error_code != '0':
+                raise Exception(f"baostock登录失败: {lg.error_msg}")
+            self.is_logged_in = True
+            logger.debug("baostock 登录成功")
+
+            if not self._atexit_registered:
+                atexit.register(self.logout)
+                self._atexit_registered = True
+
+    def logout(self):
+        """登出baostock"""
+        with self.lock:
+            if self.is_logged_in:
+                import baostock as bs
+                bs.logout()
+                self.is_logged_in = False
+
+    def invalidate(self):
+        """标记会话失效（长连接可能已被服务端断开），下次使用时重新登录"""
+        with self.lock:
+            self.is_logged_in = False
+
+
+baostock_session = BaostockSession()
+
+# 股票代码格式：可选的 sh./sz. 前缀 + 6位 ASCII 数字（\d 会匹配全角等 Unicode 数字，这里不接受）
+_STOCK_CODE_RE = re.compile(r'(?:(sh|sz)\.)?([0-9]{6})')
+_STOCK_CODE_LENGTHS = (6, 9)  # 不带前缀 / 带前缀
+
+# 交易所前缀或代码首位 -> 交易所：6开头是上海，0、3开头是深圳
+_EXCHANGE_BY_PREFIX = {'sh': 'sh', 'sz': 'sz', '6': 'sh', '0': 'sz', '3': 'sz'}
+
+
+@lru_cache(maxsize=4096)
 def validate_stock_code(stock_code: str) -> tuple[bool, str]:
     """
-    验证股票代码格式
+    验证股票代码格式（结果按输入缓存，同一代码重复校验直接命中）
 
     Args:
         stock_code: 股票代码
@@ -30,30 +105,28 @@ def validate_stock_code(stock_code: str) -> tuple[bool, str]:
 
     stock_code = stock_code.strip().lower()
 
-    # 如果已经有前缀
-    if stock_code.startswith('sh.') or stock_code.startswith('sz.'):
-        code_num = stock_code[3:]
-        if not code_num.isdigit() or len(code_num) != 6:
-            return False, "股票代码格式错误，应为6位数字"
-        return True, stock_code
-
-    # 没有前缀，自动添加
-    if not stock_code.isdigit() or len(stock_code) != 6:
+    # 长度不对时无需再做正则匹配
+    match = _STOCK_CODE_RE.fullmatch(stock_code) if len(stock_code) in _STOCK_CODE_LENGTHS else None
+    if match is None:
         return False, "股票代码格式错误，应为6位数字"
 
-    # 6开头是上海
-    if stock_code.startswith('6'):
-        return True, f'sh.{stock_code}'
-    # 0、3开头是深圳
-    elif stock_code.startswith(('0', '3')):
-        return True, f'sz.{stock_code}'
-    else:
+    # 已有前缀时按前缀，否则按代码首位确定交易所
+    prefix, digits = match.groups()
+    exchange = _EXCHANGE_BY_PREFIX.get(prefix or digits[0])
+    if exchange is None:
         return False, "无法识别的股票代码，上海以6开头，深圳以0或3开头"
 
+    return True, f'{exchange}.{digits}'
+
+
+# 金额显示单位的阈值
+_YI = 1e8   # 1亿
+_WAN = 1e4  # 1万
+
 
 def format_money(amount: float) -> str:
     """
-    格式化金额显示
+    格式化金额显示（按绝对值选择单位，负数同样适用）
 
     Args:
         amount: 金额
@@ -61,12 +134,31 @@ def format_money(amount: float) -> str:
     Returns:
         格式化后的字符串
     """
-    if amount >= 100000000:  # 1亿
-        return f'{amount/100000000:.2f}亿'
-    elif amount >= 10000:  # 1万
-        return f'{amount/10000:.2f}万'
-    else:
-        return f'{amount:.2f}'
+    magnitude = abs(amount)
+    if magnitude >= _YI:
+        return f'{amount / _YI:.2f}亿'
+    if magnitude >= _WAN:
+        return f'{amount / _WAN:.2f}万'
+    return f'{amount:.2f}'
+
+
+def format_money_vec(amounts) -> np.ndarray:
+    """
+    批量格式化金额显示，规则与 format_money 相同
+
+    Args:
+        amounts: 金额序列
+
+    Returns:
+        字符串数组
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    magnitude = np.abs(amounts)
+    conditions = [magnitude >= _YI, magnitude >= _WAN]
+
+    scaled = np.select(conditions, [amounts / _YI, amounts / _WAN], default=amounts)
+    units = np.select(conditions, ['亿', '万'], default='')
+    return np.char.add(np.char.mod('%.2f', scaled), units)
 
 
 def calculate_shares(amount: float, price: float) -> int:
@@ -92,6 +184,45 @@ def calculate_shares(amount: float, price: float) -> int:
     return shares
 
 
+if NUMBA_AVAILABLE:
+    # 单线程循环：每批只有几个订单，并行线程只会增加启动开销；
+    # gunicorn preload_app 时本模块在 fork 前导入，也不应在主进程中启动 numba 线程池
+    @njit('void(float64[:], float64[:], int64[:])', cache=True)
+    def _calculate_shares_batch_nb(amounts, prices, out):
+        """calculate_shares 的批量版本（编译为机器码循环）"""
+        for i in range(amounts.shape[0]):
+            if prices[i] > 0:
+                out[i] = (int(amounts[i] / prices[i]) // 100) * 100
+            else:
+                out[i] = 0
+
+
+def calculate_shares_batch(amounts, prices) -> np.ndarray:
+    """
+    批量计算可购买的股数，规则与 calculate_shares 相同（价格非正时为0）
+
+    Args:
+        amounts: 金额序列
+        prices: 价格序列，长度与 amounts 相同
+
+    Returns:
+        股数数组（int64，均为100的倍数）
+    """
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if amounts.shape != prices.shape:
+        raise ValueError("金额和价格的数量不一致")
+
+    if NUMBA_AVAILABLE:
+        out = np.empty(amounts.shape[0], dtype=np.int64)
+        _calculate_shares_batch_nb(amounts, prices, out)
+        return out
+
+    valid = prices > 0
+    total_shares = np.trunc(amounts / np.where(valid, prices, 1.0)).astype(np.int64)
+    return np.where(valid, (total_shares // 100) * 100, 0)
+
+
 def get_trading_days(start_date: str, end_date: str, use_baostock: bool = True) -> list[str]:
     """
     获取两个日期之间的交易日（使用 baostock 查询，考虑节假日）
@@ -106,41 +237,19 @@ def get_trading_days(start_date: str, end_date: str, use_baostock: bool = True)
     """
     if use_baostock:
         try:
-            import baostock as bs
-            _ensure_baostock_login()
-            
-            if _baostock_logged_in:
-                # 使用 baostock 查询交易日
-                rs = bs.query_trade_dates(start_date=start_date, end_date=end_date)
-                
-                if rs.error_code == '0':
-                    trading_days = []
-                    while (rs.error_code == '0') & rs.next():
-                        row_data = rs.get_row_data()
-                        # row_data[0] 是日期，row_data[1] 是 is_trading_day ('1' 或 '0')
-                        if row_data[1] == '1':  # 是交易日
-                            trading_days.append(row_data[0])
-                    return trading_days
-                else:
-                    logger.warning(f"baostock 查询交易日失败: {rs.error_msg}，使用简单判断")
+            # row_data[0] 是日期，row_data[1] 是 is_trading_day ('1' 或 '0')
+            return [
+                row_data[0]
+                for row_data in _query_trade_dates(start_date, end_date)
+                if row_data[1] == '1'
+            ]
         except ImportError:
             logger.debug("baostock 未安装，使用简单判断")
         except Exception as e:
             logger.warning(f"baostock 查询异常: {e}，使用简单判断")
     
-    # 回退到简单判断
-    start = datetime.strptime(start_date, '%Y-%m-%d')
-    end = datetime.strptime(end_date, '%Y-%m-%d')
-
-    trading_days = []
-    current = start
-
-    while current <= end:
-        if current.weekday() < 5:  # 周一到周五
-            trading_days.append(current.strftime('%Y-%m-%d'))
-        current += timedelta(days=1)
-
-    return trading_days
+    # 回退到简单判断：周一到周五
+    return pd.bdate_range(start_date, end_date).strftime('%Y-%m-%d').tolist()
 
 
 def calculate_profit(
@@ -172,6 +281,46 @@ def calculate_profit(
     }
 
 
+def calculate_profit_vec(
+    buy_price,
+    current_price,
+    shares
+) -> Dict[str, np.ndarray]:
+    """
+    批量计算盈亏（整个持仓一次计算），各字段含义与 calculate_profit 相同
+
+    Args:
+        buy_price: 买入价格序列
+        current_price: 当前价格序列
+        shares: 持仓股数序列
+
+    Returns:
+        盈亏信息字典，每个值为与输入等长的数组
+    """
+    buy_price = np.asarray(buy_price, dtype=np.float64)
+    current_price = np.asarray(current_price, dtype=np.float64)
+    shares = np.asarray(shares, dtype=np.float64)
+
+    cost = buy_price * shares
+    current_value = current_price * shares
+    profit = current_value - cost
+    # 成本为0的持仓收益率记为0，且不触发除零警告
+    profit_rate = np.divide(profit * 100.0, cost, out=np.zeros_like(profit), where=cost > 0)
+
+    return {
+        'cost': cost,
+        'current_value': current_value,
+        'profit': profit,
+        'profit_rate': profit_rate
+    }
+
+
+# 风险等级分界（回调位，左闭右开）及对应的描述
+_RISK_BOUNDS = (0.382, 0.5, 0.618, 0.786)
+_RISK_BOUNDS_ARRAY = np.array(_RISK_BOUNDS, dtype=np.float64)
+_RISK_LABELS = ("极低风险", "低风险", "中等风险", "较高风险", "高风险")
+
+
 def get_risk_level(fib_level: float) -> str:
     """
     根据斐波那契回调位评估风险等级
@@ -182,16 +331,21 @@ def get_risk_level(fib_level: float) -> str:
     Returns:
         风险等级描述
     """
-    if fib_level < 0.382:
-        return "极低风险"
-    elif fib_level < 0.5:
-        return "低风险"
-    elif fib_level < 0.618:
-        return "中等风险"
-    elif fib_level < 0.786:
-        return "较高风险"
-    else:
-        return "高风险"
+    return _RISK_LABELS[bisect_right(_RISK_BOUNDS, fib_level)]
+
+
+def get_risk_level_vec(fib_levels) -> np.ndarray:
+    """
+    批量评估风险等级，规则与 get_risk_level 相同
+
+    Args:
+        fib_levels: 斐波那契回调位序列
+
+    Returns:
+        风险等级描述数组
+    """
+    buckets = np.searchsorted(_RISK_BOUNDS_ARRAY, np.asarray(fib_levels, dtype=np.float64), side='right')
+    return np.asarray(_RISK_LABELS)[buckets]
 
 
 def generate_order_description(
@@ -216,22 +370,94 @@ def generate_order_description(
     return f"第{stage}阶段 第{order_no}单 ({fib_level:.3f}回调位, {risk})"
 
 
-def _ensure_baostock_login():
-    """确保 baostock 已登录"""
-    global _baostock_logged_in
-    if not _baostock_logged_in:
-        try:
-            import baostock as bs
-            lg = bs.login()
-            if lg.error_code == '0':
-                _baostock_logged_in = True
-                logger.debug("baostock 登录成功")
-            else:
-                logger.warning(f"baostock 登录失败: {lg.error_msg}")
-        except ImportError:
-            logger.warning("baostock 未安装，将使用简单判断")
-        except Exception as e:
-            logger.warning(f"baostock 登录异常: {e}")
+def _query_trade_dates(start_date: str, end_date: str) -> List[List[str]]:
+    """
+    在共享会话上查询交易日历
+
+    Args:
+        start_date: 开始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD
+
+    Returns:
+        [日期, 是否交易日('1'/'0')] 行列表；查询失败时抛出异常
+    """
+    import baostock as bs
+
+    with baostock_session.lock:
+        baostock_session.login()
+        rs = bs.query_trade_dates(start_date=start_date, end_date=end_date)
+        if rs.error_code != '0':
+            baostock_session.invalidate()
+            raise RuntimeError(f"baostock 查询交易日失败: {rs.error_msg}")
+
+        rows = []
+        while rs.next():
+            rows.append(rs.get_row_data())
+        return rows
+
+
+@lru_cache(maxsize=8)
+def _trading_calendar(year: int) -> np.ndarray:
+    """
+    通过 baostock 一次性查询整年的交易日历（按年缓存）
+
+    查询失败时抛出异常，不写入缓存，下次调用会重新查询。
+
+    Args:
+        year: 年份
+
+    Returns:
+        只读布尔数组，下标为当年第几天（从0开始），True 表示交易日；未返回数据的日期视为非交易日
+    """
+    rows = _query_trade_dates(f'{year}-01-01', f'{year}-12-31')
+    if not rows:
+        raise RuntimeError(f"baostock 未返回 {year} 年的交易日历")
+
+    # row_data[0] 是日期，row_data[1] 是 is_trading_day ('1' 或 '0')
+    dates = [row_data[0] for row_data in rows]
+    flags = [row_data[1] for row_data in rows]
+
+    day_index = pd.to_datetime(dates, format='%Y-%m-%d').dayofyear.to_numpy() - 1
+    calendar = np.zeros(366, dtype=bool)
+    calendar[day_index] = np.asarray(flags) == '1'
+    calendar.flags.writeable = False
+    return calendar
+
+
+# 交易日历查询失败后，该年份在这段时间内不再查询，直接使用简单判断（秒）
+CALENDAR_RETRY_INTERVAL = 60.0
+
+# 查询失败的年份 -> (失败时的 time.monotonic(), 异常)
+_calendar_failures: Dict[int, Tuple[float, Exception]] = {}
+
+
+def _load_trading_calendar(year: int, use_cache: bool = True) -> np.ndarray:
+    """
+    获取某年的交易日历（见 _trading_calendar）
+
+    查询失败时记录失败时间，CALENDAR_RETRY_INTERVAL 秒内再次获取同一年份直接抛出上次的异常，
+    避免 baostock 不可用期间每次判断交易日（如调度器每次唤醒）都发起一次网络请求。
+
+    Args:
+        year: 年份
+        use_cache: 是否使用缓存；为False时总是重新查询
+
+    Returns:
+        交易日历数组，查询失败时抛出异常
+    """
+    if use_cache:
+        failure = _calendar_failures.get(year)
+        if failure is not None and time.monotonic() - failure[0] < CALENDAR_RETRY_INTERVAL:
+            raise failure[1].with_traceback(None)
+
+    load = _trading_calendar if use_cache else _trading_calendar.__wrapped__
+    try:
+        calendar = load(year)
+    except Exception as e:
+        _calendar_failures[year] = (time.monotonic(), e)
+        raise
+    _calendar_failures.pop(year, None)
+    return calendar
 
 
 def is_trading_day(date: Optional[datetime] = None, use_cache: bool = True) -> bool:
@@ -247,70 +473,27 @@ def is_trading_day(date: Optional[datetime] = None, use_cache: bool = True) -> b
     """
     if date is None:
         date = datetime.now()
-    
-    # 格式化日期为字符串
-    date_str = date.strftime('%Y-%m-%d')
-    
-    # 检查缓存
-    if use_cache and date_str in _trading_day_cache:
-        return _trading_day_cache[date_str]
-    
+
     # 首先进行简单判断（周末肯定不是交易日）
     if date.weekday() >= 5:  # 周六、周日
-        _trading_day_cache[date_str] = False
         return False
-    
-    # 尝试使用 baostock 查询
+
+    # 首次查询某年时一次性取回整年日历，之后同年的判断都在内存中完成
     try:
-        import baostock as bs
-        _ensure_baostock_login()
-        
-        if _baostock_logged_in:
-            # 查询指定日期是否为交易日
-            # baostock 的 query_trade_dates 接口
-            rs = bs.query_trade_dates(start_date=date_str, end_date=date_str)
-            
-            if rs.error_code == '0':
-                # 解析结果
-                data_list = []
-                while (rs.error_code == '0') & rs.next():
-                    data_list.append(rs.get_row_data())
-                
-                if data_list:
-                    # 检查 is_trading_day 字段，'1' 表示交易日，'0' 表示非交易日
-                    is_trading = data_list[0][1] == '1'
-                    _trading_day_cache[date_str] = is_trading
-                    return is_trading
-                else:
-                    # 如果没有数据，可能是非交易日
-                    logger.debug(f"baostock 未返回 {date_str} 的数据，假设为非交易日")
-                    _trading_day_cache[date_str] = False
-                    return False
-            else:
-                logger.warning(f"baostock 查询交易日失败: {rs.error_msg}，使用简单判断")
-                # 回退到简单判断
-                is_trading = date.weekday() < 5
-                _trading_day_cache[date_str] = is_trading
-                return is_trading
-        else:
-            # baostock 未登录，使用简单判断
-            logger.debug("baostock 未登录，使用简单判断")
-            is_trading = date.weekday() < 5
-            _trading_day_cache[date_str] = is_trading
-            return is_trading
-            
+        return bool(_load_trading_calendar(date.year, use_cache)[date.timetuple().tm_yday - 1])
     except ImportError:
         # baostock 未安装，使用简单判断
         logger.debug("baostock 未安装，使用简单判断")
-        is_trading = date.weekday() < 5
-        _trading_day_cache[date_str] = is_trading
-        return is_trading
     except Exception as e:
         # 查询异常，使用简单判断
         logger.warning(f"查询交易日异常: {e}，使用简单判断")
-        is_trading = date.weekday() < 5
-        _trading_day_cache[date_str] = is_trading
-        return is_trading
+
+    # 回退到简单判断：周一到周五
+    return True
+
+
+# A股交易时间：上午 9:30 - 11:30，下午 13:00 - 15:00
+_MARKET_HOURS = (dt_time(9, 30), dt_time(11, 30), dt_time(13, 0), dt_time(15, 0))
 
 
 def get_market_hours() -> tuple[dt_time, dt_time, dt_time, dt_time]:
@@ -320,15 +503,7 @@ def get_market_hours() -> tuple[dt_time, dt_time, dt_time, dt_time]:
     Returns:
         (上午开盘时间, 上午收盘时间, 下午开盘时间, 下午收盘时间)
     """
-    # A股交易时间：
-    # 上午：9:30 - 11:30
-    # 下午：13:00 - 15:00
-    morning_open = dt_time(9, 30)
-    morning_close = dt_time(11, 30)
-    afternoon_open = dt_time(13, 0)
-    afternoon_close = dt_time(15, 0)
-    
-    return morning_open, morning_close, afternoon_open, afternoon_close
+    return _MARKET_HOURS
 
 
 def is_trading_time(current_time: Optional[datetime] = None) -> bool:
@@ -343,23 +518,22 @@ def is_trading_time(current_time: Optional[datetime] = None) -> bool:
     """
     if current_time is None:
         current_time = datetime.now()
-    
-    if not is_trading_day(current_time):
-        return False
-    
-    morning_open, morning_close, afternoon_open, afternoon_close = get_market_hours()
-    current_time_only = current_time.time()
-    
+
+    # 先比较时刻（廉价），不在交易时段内时无需再判断交易日
+    morning_open, morning_close, afternoon_open, afternoon_close = _MARKET_HOURS
+    time_of_day = current_time.time()
+
     # 检查是否在上午交易时间或下午交易时间
-    is_morning = morning_open <= current_time_only <= morning_close
-    is_afternoon = afternoon_open <= current_time_only <= afternoon_close
-    
-    return is_morning or is_afternoon
+    if not (morning_open <= time_of_day <= morning_close
+            or afternoon_open <= time_of_day <= afternoon_close):
+        return False
+
+    return is_trading_day(current_time)
 
 
 def get_next_trading_day(date: Optional[datetime] = None) -> datetime:
     """
-    获取下一个交易日（使用 baostock 查询）
+    获取下一个交易日（在预取的 baostock 年度交易日历上查找）
 
     Args:
         date: 起始日期，如果为None则使用当前日期
@@ -369,21 +543,40 @@ def get_next_trading_day(date: Optional[datetime] = None) -> datetime:
     """
     if date is None:
         date = datetime.now()
-    
-    # 最多查询未来30天
+
+    # 最多查找未来30天
     max_days = 30
     next_day = date + timedelta(days=1)
-    days_checked = 0
-    
-    while days_checked < max_days:
-        if is_trading_day(next_day):
-            return next_day
-        next_day += timedelta(days=1)
-        days_checked += 1
-    
+
+    try:
+        # 从 next_day 起截取当年剩余的日历，不足 max_days 天时接上下一年年初
+        year = next_day.year
+        days_in_year = (datetime(year + 1, 1, 1) - datetime(year, 1, 1)).days
+        start = next_day.timetuple().tm_yday - 1
+        window = _load_trading_calendar(year)[start:min(start + max_days, days_in_year)]
+        if not window.any() and len(window) < max_days:
+            window = np.concatenate([window, _load_trading_calendar(year + 1)[:max_days - len(window)]])
+
+        # argmax 返回第一个 True 的位置；全为 False 时返回0，需再确认
+        offset = int(np.argmax(window))
+        if window[offset]:
+            return next_day + timedelta(days=offset)
+    except ImportError:
+        logger.debug("baostock 未安装，使用简单判断")
+        return _next_weekday(next_day)
+    except Exception as e:
+        logger.warning(f"查询交易日异常: {e}，使用简单判断")
+        return _next_weekday(next_day)
+
     # 如果30天内没找到，返回计算出的日期（可能不准确）
     logger.warning(f"在 {max_days} 天内未找到下一个交易日，返回计算日期")
-    return next_day
+    return next_day + timedelta(days=max_days)
+
+
+def _next_weekday(date: datetime) -> datetime:
+    """返回 date 当天或之后的第一个工作日（周末顺延到周一）"""
+    weekday = date.weekday()
+    return date + timedelta(days=7 - weekday) if weekday >= 5 else date
 
 
 def get_market_close_time(date: Optional[datetime] = None) -> datetime:
@@ -435,15 +628,35 @@ def save_pending_orders(orders: List[Dict[str, Any]], file_path: str = "pending_
             'orders': orders
         }
         
+        if orjson is not None:
+            payload = orjson.dumps(
+                data,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        else:
+            payload = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
         # 确保目录存在
-        os.makedirs(os.path.dirname(file_path) if os.path.dirname(file_path) else '.', exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
+        path = Path(file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 先写临时文件再原子替换，写入中途崩溃也不会留下残缺的订单文件；
+        # 临时文件名唯一，并发写入（多线程或多个 gunicorn worker）不会互相覆盖
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'{path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
         return True
     except Exception as e:
-        print(f"保存待下单订单失败: {e}")
+        logger.error("保存待下单订单失败: %s", e)
         return False
 
 
@@ -461,12 +674,12 @@ def load_pending_orders(file_path: str = "pending_orders.json") -> List[Dict[str
         if not os.path.exists(file_path):
             return []
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
+        content = Path(file_path).read_bytes()
+        data = orjson.loads(content) if orjson is not None else json.loads(content)
+
         return data.get('orders', [])
     except Exception as e:
-        print(f"加载待下单订单失败: {e}")
+        logger.error("加载待下单订单失败: %s", e)
         return []
 
 
@@ -485,7 +698,7 @@ def clear_pending_orders(file_path: str = "pending_orders.json") -> bool:
             os.remove(file_path)
         return True
     except Exception as e:
-        print(f"清除待下单订单失败: {e}")
+        logger.error("清除待下单订单失败: %s", e)
         return False
 
 
@@ -501,6 +714,7 @@ if __name__ == '__main__':
     amounts = [1000, 15000, 100000, 1500000, 50000000, 120000000]
     for amount in amounts:
         print(f"{amount:12} -> {format_money(amount)}")
+    print(f"批量格式化: {format_money_vec(amounts).tolist()}")
 
     print("\n=== 股数计算测试 ===")
     tests = [(10000, 10.5), (50000, 15.8), (5000, 100)]
@@ -508,14 +722,18 @@ if __name__ == '__main__':
         shares = calculate_shares(amount, price)
         actual_cost = shares * price
         print(f"金额: {amount}, 价格: {price} -> {shares}股, 实际花费: {actual_cost:.2f}")
+    print(f"批量计算: {calculate_shares_batch(*zip(*tests)).tolist()}")
 
     print("\n=== 盈亏计算测试 ===")
     profit_info = calculate_profit(10.5, 12.0, 1000)
     print(f"买入价: 10.5, 当前价: 12.0, 持仓: 1000股")
     print(f"成本: {profit_info['cost']}, 市值: {profit_info['current_value']}")
     print(f"盈亏: {profit_info['profit']:.2f}, 收益率: {profit_info['profit_rate']:.2f}%")
+    profit_vec = calculate_profit_vec([10.5, 20.0], [12.0, 18.0], [1000, 500])
+    print(f"批量收益率: {profit_vec['profit_rate'].round(2).tolist()}")
 
     print("\n=== 风险等级测试 ===")
     levels = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8]
     for level in levels:
         print(f"{level:.3f} -> {get_risk_level(level)}")
+    print(f"批量评估: {get_risk_level_vec(levels).tolist()}")
@@ -1,13 +1,28 @@
 """
 XTTrader 交易接口封装
 """
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any, Set, Tuple, Union
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import atexit
+import itertools
 import logging
+import queue
+import random
+import re
 import time
 import threading
 from datetime import datetime, timedelta
+from functools import lru_cache
+from math import inf, nan
+from operator import itemgetter
 import os
 
+import numpy as np
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -23,18 +38,194 @@ except ImportError:
 # 常量定义
 LOT_SIZE = 100  # 每手股数（A股标准）
 MIN_LOT_SIZE = 100  # 最小交易单位
+DEFAULT_ORDER_WORKERS = 16  # 并行下单的默认最大线程数
+ASYNC_ORDER_TIMEOUT = 10  # 异步下单等待回报的超时时间（秒）
+DEFAULT_MAX_INFLIGHT = 64  # 异步下单时已发出、尚未收到回报的请求数上限
+DEFAULT_HEARTBEAT_INTERVAL = 30  # 后台心跳探测连接的间隔（秒）
+DEFAULT_QUERY_CACHE_TTL = 0.25  # query_asset / query_orders / query_trades / query_positions 结果的缓存时间（秒）
+DEFAULT_RECONNECT_RETRIES = 3  # reconnect() 首次失败后的最大重试次数
+DEFAULT_MAX_BACKOFF = 300.0  # 重连退避等待的上限（秒）
+RECONNECT_INITIAL_DELAY = 1.0  # 第一次重试前的等待时间（秒），之后每次翻倍
+RECONNECT_BACKOFF_FACTOR = 2.0
+RUN_FOREVER_POLL_INTERVAL = 0.5  # run_forever() 检查停止信号的间隔（秒）
+VECTORIZE_MIN_BATCH = 64  # 订单数达到该值时按列向量化预校验
+FINISHED_SEQ_LIMIT = 4096  # 记住最近多少个已完成配对或已放弃的异步下单序号（用于丢弃迟到的回报）
+
+# 可缓存结果的查询（见 XTTraderClient._cached_query）
+_QUERY_CACHE_KEYS = ('asset', 'orders', 'trades', 'positions')
+
+# 模拟下单的日志模板（参数在日志级别生效时才格式化）
+_MOCK_ORDER_LOG = "模拟下单: %s, 方向: %s, 价格: %s, 数量: %s, 订单ID: %s"
+_MOCK_ASYNC_ORDER_LOG = "模拟异步下单: %s, 方向: %s, 价格: %s, 数量: %s, 序列号: %s"
+
+# 股票代码：sh.600000 形式（/api/execute 传入的格式）或 xtquant 的 600000.SH 形式，不区分大小写；
+# 沪深京为6位数字，港股（沪港通/深港通账户）为5位数字，如 00700.HK
+_STOCK_CODE_RE = re.compile(
+    r'(sh|sz|bj)\.([0-9]{6})|([0-9]{6})\.(sh|sz|bj)|(hk)\.([0-9]{5})|([0-9]{5})\.(hk)',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def _to_xt_stock_code(stock_code: str) -> Optional[str]:
+    """
+    校验股票代码并转换为 xtquant 格式（结果按输入缓存，同一批中重复的代码直接命中）
+
+    Args:
+        stock_code: 股票代码，如 sh.600000、600000.SH 或 00700.HK
+
+    Returns:
+        xtquant 格式的代码（如 600000.SH），格式错误时返回None
+    """
+    match = _STOCK_CODE_RE.fullmatch(stock_code)
+    if match is None:
+        return None
+    # 匹配的分支恰好有两个分组非空：交易所和代码数字，顺序取决于写法
+    first, second = (group for group in match.groups() if group)
+    exchange, digits = (second, first) if first.isdigit() else (first, second)
+    return f'{digits}.{exchange.upper()}'
+
+
+def _default_session_id() -> int:
+    """
+    默认的 xtquant 会话编号：时间戳（秒，取后4位）与进程号（取后5位）拼接
+
+    gunicorn 的每个 worker 各自创建客户端、持有独立的交易会话，同一秒内启动的 worker
+    只用时间戳会得到相同的会话编号；拼入进程号后同时存活的进程互不相同，且结果小于 2**31。
+    """
+    return int(time.time()) % 10000 * 100000 + os.getpid() % 100000
+
+
+@lru_cache(maxsize=1024)
+def _insufficient_lot_message(price: float) -> str:
+    """金额不足一手的错误信息（同一批中同价位的订单通常很多，按价格缓存）"""
+    return f'金额不足一手（需要至少 {price * MIN_LOT_SIZE:.2f} 元）'
+
+
+def _safe_float(value: Any) -> float:
+    """转换为 float，无法转换（如 None、非数字字符串）时返回 NaN 而不抛出异常"""
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return nan
+
+
+def _normalize_order_fields(stock_code: Any, price: Any, amount: Any) -> Tuple[str, float, float]:
+    """
+    统一批量下单中订单字段的类型（逐个校验与按列校验共用，同一订单在不同批量大小下结果一致）
+
+    Args:
+        stock_code: 股票代码，不是字符串时视为空
+        price: 价格，无法转换时为 NaN
+        amount: 金额，无法转换时为 NaN
+
+    Returns:
+        (去除首尾空白的股票代码, 价格, 金额)
+    """
+    stock_code = stock_code.strip() if isinstance(stock_code, str) else ''
+    return stock_code, _safe_float(price), _safe_float(amount)
+
+
+# 一次取出订单的三个字段；订单都带齐这些键（如 /api/execute 构造的订单）时比逐个 .get 快，
+# 缺键时（KeyError）回退到带默认值的 .get
+_ORDER_FIELDS = itemgetter('stock_code', 'price', 'amount')
+
+# 批量下单中预校验后的订单：(原始订单, 股票代码, 价格, 股数, 错误信息或None)
+PreparedOrder = Tuple[Dict[str, Any], str, float, int, Optional[str]]
+
+
+class OrderResult:
+    """批量下单中单个订单的结果（大批量时比逐个构造字典省内存）"""
+
+    __slots__ = ('order', 'success', 'order_id', 'volume', 'message')
+
+    def __init__(
+        self,
+        order: Dict[str, Any],
+        success: bool,
+        order_id: Any = None,
+        volume: Optional[int] = None,
+        message: str = ''
+    ):
+        self.order = order
+        self.success = success
+        self.order_id = order_id
+        self.volume = volume
+        self.message = message
+
+    def as_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于 API 响应）"""
+        return {
+            'order': self.order,
+            'success': self.success,
+            'order_id': self.order_id,
+            'volume': self.volume,
+            'message': self.message
+        }
+
+
+# 回调日志：xtquant 回调线程只把记录放入队列，由后台线程交给本模块 logger 输出，
+# 避免在回调线程中等待 handler 的锁和 I/O
+_callback_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_callback_logger = logging.getLogger(f'{__name__}.callback')
+_callback_logger.addHandler(QueueHandler(_callback_log_queue))
+_callback_logger.propagate = False
+_callback_log_listener: Optional[QueueListener] = None
+_callback_log_lock = threading.Lock()
+
+
+class _ForwardHandler(logging.Handler):
+    """把队列中取出的日志记录交给本模块 logger，沿用其上级（根 logger）的 handler"""
+
+    def emit(self, record: logging.LogRecord):
+        logger.handle(record)
+
+
+def _start_callback_log_listener():
+    """
+    启动回调日志的后台输出线程（首次创建回调对象时调用，进程退出时停止）
+
+    不在导入时启动：gunicorn preload 后 fork 出的 worker 中不会有父进程的线程。
+    """
+    global _callback_log_listener
+    with _callback_log_lock:
+        if _callback_log_listener is None:
+            _callback_log_listener = QueueListener(_callback_log_queue, _ForwardHandler())
+            _callback_log_listener.start()
+            atexit.register(_callback_log_listener.stop)
 
 
 # 回调类定义（仅在xtquant可用时）
 if XTQUANT_AVAILABLE:
     class XTTraderCallback(XtQuantTraderCallback):
         """XTTrader回调处理器"""
-        
+
+        __slots__ = ('_client', '_log_info', '_log_warning', '_log_error')
+
+        def __init__(self, client: Optional['XTTraderClient'] = None):
+            """
+            Args:
+                client: 所属的交易客户端，用于把异步下单回报对应到等待中的请求
+            """
+            super().__init__()
+            self._client = client
+            # 日志方法绑定一次，每次推送只需读取实例属性
+            self._log_info = _callback_logger.info
+            self._log_warning = _callback_logger.warning
+            self._log_error = _callback_logger.error
+            _start_callback_log_listener()
+
         def on_disconnected(self):
             """连接断开回调"""
-            logger.warning("XTTrader连接已断开")
+            self._log_warning("XTTrader连接已断开")
             # 注意：这里不能直接调用reconnect，因为可能在回调线程中
-            # 实际的连接状态会在下次操作时通过check_connection检测
+            # 只清除连接标志，下次操作时由 check_connection 重连
+            if self._client is not None:
+                self._client._mark_disconnected()
         
         def on_stock_order(self, order):
             """
@@ -43,10 +234,12 @@ if XTQUANT_AVAILABLE:
             Args:
                 order: XtOrder对象
             """
-            logger.info(
-                f"委托回报: 股票={order.stock_code}, "
-                f"状态={order.order_status}, 系统ID={order.order_sysid}"
+            self._log_info(
+                "委托回报: 股票=%s, 状态=%s, 系统ID=%s",
+                order.stock_code, order.order_status, order.order_sysid
             )
+            if self._client is not None:
+                self._client._invalidate_query_cache()
         
         def on_stock_trade(self, trade):
             """
@@ -55,10 +248,14 @@ if XTQUANT_AVAILABLE:
             Args:
                 trade: XtTrade对象
             """
-            logger.info(
-                f"成交回报: 账户={trade.account_id}, "
-                f"股票={trade.stock_code}, 订单ID={trade.order_id}"
-            )
+            # 成交推送频繁，逐笔明细只在 DEBUG 级别输出，避免每次回调都读取属性
+            if _callback_logger.isEnabledFor(logging.DEBUG):
+                _callback_logger.debug(
+                    "成交回报: 账户=%s, 股票=%s, 订单ID=%s",
+                    trade.account_id, trade.stock_code, trade.order_id
+                )
+            if self._client is not None:
+                self._client._invalidate_query_cache()
         
         def on_order_error(self, order_error):
             """
@@ -67,10 +264,13 @@ if XTQUANT_AVAILABLE:
             Args:
                 order_error: XtOrderError对象
             """
-            logger.error(
-                f"委托失败: 订单ID={order_error.order_id}, "
-                f"错误码={order_error.error_id}, 错误信息={order_error.error_msg}"
+            self._log_error(
+                "委托失败: 订单ID=%s, 错误码=%s, 错误信息=%s",
+                order_error.order_id, order_error.error_id, order_error.error_msg
             )
+            seq = getattr(order_error, 'seq', None)
+            if self._client is not None and seq is not None:
+                self._client._resolve_order_future(seq, error_msg=order_error.error_msg, pending_only=True)
         
         def on_cancel_error(self, cancel_error):
             """
@@ -79,9 +279,9 @@ if XTQUANT_AVAILABLE:
             Args:
                 cancel_error: XtCancelError对象
             """
-            logger.error(
-                f"撤单失败: 订单ID={cancel_error.order_id}, "
-                f"错误码={cancel_error.error_id}, 错误信息={cancel_error.error_msg}"
+            self._log_error(
+                "撤单失败: 订单ID=%s, 错误码=%s, 错误信息=%s",
+                cancel_error.order_id, cancel_error.error_id, cancel_error.error_msg
             )
         
         def on_order_stock_async_response(self, response):
@@ -91,10 +291,16 @@ if XTQUANT_AVAILABLE:
             Args:
                 response: XtOrderResponse对象
             """
-            logger.info(
-                f"异步下单回报: 账户={response.account_id}, "
-                f"订单ID={response.order_id}, 序列号={response.seq}"
+            self._log_info(
+                "异步下单回报: 账户=%s, 订单ID=%s, 序列号=%s",
+                response.account_id, response.order_id, response.seq
             )
+            if self._client is not None:
+                if response.order_id is not None and response.order_id >= 0:
+                    self._client._resolve_order_future(response.seq, order_id=response.order_id)
+                else:
+                    error_msg = getattr(response, 'error_msg', '') or '异步下单被拒绝'
+                    self._client._resolve_order_future(response.seq, error_msg=error_msg)
         
         def on_account_status(self, status):
             """
@@ -103,9 +309,9 @@ if XTQUANT_AVAILABLE:
             Args:
                 status: XtAccountStatus对象
             """
-            logger.info(
-                f"账户状态: 账户ID={status.account_id}, "
-                f"账户类型={status.account_type}, 状态={status.status}"
+            self._log_info(
+                "账户状态: 账户ID=%s, 账户类型=%s, 状态=%s",
+                status.account_id, status.account_type, status.status
             )
 else:
     # 模拟模式下的占位类
@@ -115,8 +321,26 @@ else:
 
 class XTTraderClient:
     """XTTrader交易客户端"""
+
+    # 模拟订单ID / 异步请求序号的进程内计数器（next() 在 GIL 下是原子的），同一批次内也不会重复
+    _mock_seq = itertools.count(1)
     
-    def __init__(self, path: str = "", account_id: str = "", account_type: str = "STOCK", session_id: Optional[int] = None):
+    def __init__(
+        self,
+        path: str = "",
+        account_id: str = "",
+        account_type: str = "STOCK",
+        session_id: Optional[int] = None,
+        max_workers: int = DEFAULT_ORDER_WORKERS,
+        use_async: bool = False,
+        batch_async: bool = True,
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+        cpu_affinity: Optional[Set[int]] = None,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        max_retries: int = DEFAULT_RECONNECT_RETRIES,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        query_cache_ttl: Union[float, Dict[str, float]] = DEFAULT_QUERY_CACHE_TTL
+    ):
         """
         初始化XTTrader客户端
 
@@ -124,35 +348,98 @@ class XTTraderClient:
             path: XTTrader路径（mini qmt客户端安装目录下userdata_mini路径）
             account_id: 账户ID
             account_type: 账户类型，如'STOCK'（默认）、'HUGANGTONG'（沪港通）、'SHENGANGTONG'（深港通）
-            session_id: 会话编号，策略使用方对于不同的Python策略需要使用不同的会话编号。如果为None，则使用时间戳
+            session_id: 会话编号，策略使用方对于不同的Python策略需要使用不同的会话编号。
+                        如果为None，则由时间戳和进程号生成（见 _default_session_id）
+            max_workers: 批量下单时并行提交的最大线程数
+            use_async: 实盘单笔下单是否使用 order_stock_async（通过回调取得订单编号）
+            batch_async: 实盘批量下单是否用 order_stock_async 一次性发出全部请求再统一等待回报；
+                         为False时在线程池中并行调用阻塞的 order_stock
+            max_inflight: 异步下单时同时等待回报的请求数上限，达到上限后发送方阻塞等待
+            cpu_affinity: 连接时绑定的 CPU 核编号（如 {0, 1}），让 xtquant 的 I/O 线程与调用方
+                          运行在同一组核上；为None时不绑定
+            heartbeat_interval: 后台心跳线程探测连接的间隔（秒）
+            max_retries: reconnect() 首次连接失败后的最大重试次数（指数退避，带随机抖动）
+            max_backoff: 两次重试之间等待时间的上限（秒）
+            query_cache_ttl: 查询结果的缓存时间（秒），可按查询分别指定，
+                             如 {'asset': 0.5, 'positions': 1.0, 'orders': 0, 'trades': 0}，0 表示不缓存
         """
         self.path = path
-        self.session_id = session_id if session_id is not None else int(time.time())
+        self.session_id = session_id if session_id is not None else _default_session_id()
         self.account_id = account_id
         self.account_type = account_type
         self.is_connected = False
         self.is_mock_mode = not XTQUANT_AVAILABLE
-        self._last_heartbeat = None
+        self.cpu_affinity = cpu_affinity
+        self._last_heartbeat: Optional[float] = None  # 最近一次确认连接正常的 time.monotonic()
         self._reconnect_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._stop_reconnect = threading.Event()  # disconnect() 时置位，打断正在退避等待的重连
+
+        # 查询结果缓存：查询名 -> (time.monotonic() 取得时间, 结果)；下单、撤单成功及委托/成交推送时清空
+        if isinstance(query_cache_ttl, dict):
+            self._query_cache_ttl = {key: query_cache_ttl.get(key, DEFAULT_QUERY_CACHE_TTL) for key in _QUERY_CACHE_KEYS}
+        else:
+            self._query_cache_ttl = dict.fromkeys(_QUERY_CACHE_KEYS, query_cache_ttl)
+        self._query_cache: Dict[str, Tuple[float, Any]] = {}
+
+        # 连接状态由后台心跳线程维护，下单和查询只读取 _connected_ok，不在调用路径上探测连接
+        self.heartbeat_interval = heartbeat_interval
+        self._connected_ok = threading.Event()
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()  # disconnect() 时置位，结束 run_forever() 的等待
+
+        # 批量下单线程池，首次并行下单时创建（gunicorn fork 之后）
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        # 异步下单：请求序号 seq -> 等待回报的 Future，由 _pending_lock 保护
+        self.use_async = use_async
+        self.batch_async = batch_async
+        self._pending_orders: Dict[int, Future] = {}
+        # 已完成配对或下单方已放弃（等待超时）的 seq，之后再到达的回报直接丢弃，不再登记新的 Future；
+        # 只保留最近 FINISHED_SEQ_LIMIT 个，与 _pending_orders 一样由 _pending_lock 保护
+        self._finished_seqs: Set[int] = set()
+        self._finished_order: deque = deque()
+        self._pending_lock = threading.Lock()
+        self._submit_lock = threading.Lock()  # 并发的批量下单中，每批已取得在途名额的一段请求连续发出，不互相穿插
+        # 在途请求数的上限：发出前获取，Future 完成（收到回报、出错或等待超时被取消）时释放
+        self.max_inflight = max_inflight
+        self._inflight = threading.Semaphore(max_inflight)
         
         # 初始化交易接口
+        # XtQuantTrader、账户对象和回调在进程内只创建/注册一次，重连时复用，只重新握手和订阅
         self.xttrader: Optional[Any] = None
         self.account: Optional[Any] = None
         self.callback: Optional[Any] = None
+        self._started = False  # xttrader.start() 已调用（交易线程只需启动一次）
+
+        # 下单路径上每次都要用到的下单函数（连接成功后取一次，见 connect）和 xtconstant 常量
+        self._order_fn: Optional[Any] = None
+        self._fix_price: Optional[int] = None
         
         if not self.is_mock_mode:
             try:
                 self.xttrader = XtQuantTrader(self.path, self.session_id)
                 self.account = StockAccount(self.account_id, self.account_type)
-                self.callback = XTTraderCallback()
+                self.callback = XTTraderCallback(self)
                 self.xttrader.register_callback(self.callback)
                 logger.info("XTTrader客户端初始化成功")
             except Exception as e:
-                logger.error(f"XTTrader初始化失败: {e}，切换到模拟模式")
+                logger.error("XTTrader初始化失败: %s，切换到模拟模式", e)
                 self.is_mock_mode = True
         else:
             logger.info("使用模拟模式（xtquant未安装）")
 
+        # 交易方向 -> 下单参数，模拟模式下为占位字符串；下单时一次字典查找即可确定方向
+        if self.is_mock_mode:
+            self._side_map: Dict[str, Any] = {'buy': 'BUY', 'sell': 'SELL'}
+        else:
+            self._side_map = {'buy': xtconstant.STOCK_BUY, 'sell': xtconstant.STOCK_SELL}
+            self._fix_price = xtconstant.FIX_PRICE
+
     def connect(self) -> bool:
         """
         连接到XTTrader
@@ -163,6 +450,7 @@ class XTTraderClient:
         if self.is_mock_mode:
             logger.info("模拟模式：连接成功")
             self.is_connected = True
+            self._connected_ok.set()
             return True
 
         if self.xttrader is None:
@@ -170,76 +458,188 @@ class XTTraderClient:
             return False
 
         try:
-            # 启动连接
-            self.xttrader.start()
+            # 启动交易线程（重连时已在运行，不再重复启动）；
+            # 先绑定 CPU，start() 创建的 xtquant 线程会继承调用线程的亲和性
+            if not self._started:
+                self._apply_cpu_affinity()
+                self.xttrader.start()
+                self._started = True
             
             # 建立连接
             connect_result = self.xttrader.connect()
             if connect_result != 0:
-                logger.error(f"XTTrader连接失败，错误码: {connect_result}")
+                logger.error("XTTrader连接失败，错误码: %s", connect_result)
                 return False
             
             # 订阅账户
             subscribe_result = self.xttrader.subscribe(self.account)
             if subscribe_result != 0:
-                logger.error(f"XTTrader订阅失败，错误码: {subscribe_result}")
+                logger.error("XTTrader订阅失败，错误码: %s", subscribe_result)
                 self.is_connected = False
                 return False
             
+            self._order_fn = self.xttrader.order_stock
+
             self.is_connected = True
-            self._last_heartbeat = time.time()
-            logger.info(f"XTTrader连接成功，账户: {self.account_id}")
+            self._last_heartbeat = time.monotonic()
+            self._connected_ok.set()
+            self._start_heartbeat()
+            logger.info("XTTrader连接成功，账户: %s", self.account_id)
             return True
             
         except Exception as e:
-            logger.error(f"XTTrader连接异常: {e}", exc_info=True)
+            logger.error("XTTrader连接异常: %s", e, exc_info=True)
             self.is_connected = False
             return False
 
+    def _apply_cpu_affinity(self):
+        """按 cpu_affinity 绑定 CPU（Linux 绑定当前线程及其后创建的线程，Windows 绑定整个进程），失败时只记录警告"""
+        if not self.cpu_affinity:
+            return
+
+        try:
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, self.cpu_affinity)
+            elif os.name == 'nt':
+                import ctypes
+                mask = sum(1 << cpu for cpu in self.cpu_affinity)
+                kernel32 = ctypes.windll.kernel32
+                if not kernel32.SetProcessAffinityMask(kernel32.GetCurrentProcess(), mask):
+                    raise ctypes.WinError()
+            else:
+                logger.warning("当前平台不支持设置CPU亲和性，已忽略 cpu_affinity")
+                return
+            logger.info("已绑定CPU: %s", sorted(self.cpu_affinity))
+        except OSError as e:
+            logger.warning("绑定CPU %s 失败: %s", sorted(self.cpu_affinity), e)
+
+    def _start_heartbeat(self):
+        """启动后台心跳线程（已在运行时不重复启动）"""
+        if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+            return
+        self._stop_heartbeat.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            name='xt-heartbeat',
+            daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        """每隔 heartbeat_interval 秒查询一次资产探测连接，失败时清除连接标志并尝试重连"""
+        while not self._stop_heartbeat.wait(self.heartbeat_interval):
+            try:
+                alive = self.xttrader.query_stock_asset(self.account) is not None
+            except Exception as e:
+                logger.warning("心跳检测异常: %s", e)
+                alive = False
+
+            if alive:
+                self._last_heartbeat = time.monotonic()
+                self._connected_ok.set()
+                continue
+
+            logger.warning("心跳检测失败，尝试重连XTTrader")
+            self._connected_ok.clear()
+            self.is_connected = False
+            # reconnect() 持锁时会在 disconnect() 中等待本线程退出，这里不能阻塞等锁
+            if self._reconnect_lock.acquire(blocking=False):
+                try:
+                    self.connect()
+                finally:
+                    self._reconnect_lock.release()
+
+    @staticmethod
+    def _copy_query_result(result: Any) -> Any:
+        """复制查询结果（字典或字典列表），缓存中的结果与返回给调用方的互不影响"""
+        if isinstance(result, list):
+            return [item.copy() for item in result]
+        return result.copy()
+
+    def _cached_query(self, key: str) -> Optional[Any]:
+        """
+        取得查询 key 在缓存时间内的结果（返回副本，调用方可以修改），没有时返回None
+
+        调用方应先通过 check_connection 确认连接，断开后不返回缓存的旧结果。
+        """
+        entry = self._query_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self._query_cache_ttl[key]:
+            return self._copy_query_result(entry[1])
+        return None
+
+    def _store_query(self, key: str, result: Any):
+        """缓存查询 key 的结果（保存副本，调用方之后修改 result 不影响缓存）"""
+        if self._query_cache_ttl[key] > 0:
+            self._query_cache[key] = (time.monotonic(), self._copy_query_result(result))
+
+    def _invalidate_query_cache(self):
+        """清空查询缓存（资金、委托、成交、持仓可能已变化）"""
+        self._query_cache.clear()
+
+    def _mark_disconnected(self):
+        """标记连接已断开（供断开回调使用），下一次调用时 check_connection 会重连"""
+        self._connected_ok.clear()
+        self.is_connected = False
+
     def check_connection(self) -> bool:
         """
         检查连接状态，如果断开则尝试重连
-        
+
+        连接是否有效由后台心跳线程探测，这里只读取其结果，连接正常时不产生额外开销。
+
         Returns:
             连接是否正常
         """
+        if self._connected_ok.is_set():
+            return True
+
         if self.is_mock_mode:
             return self.is_connected
-        
-        if not self.is_connected:
-            logger.warning("连接已断开，尝试重连...")
-            return self.connect()
-        
-        # 尝试查询资产来检测连接是否真的有效
-        try:
-            # 简单的连接检测：如果xttrader对象存在且已连接，认为连接正常
-            if self.xttrader is not None:
-                self._last_heartbeat = time.time()
-                return True
-            else:
-                logger.warning("xttrader对象不存在，需要重连")
-                return self.reconnect()
-        except Exception as e:
-            logger.warning(f"连接检测异常: {e}，尝试重连")
-            return self.reconnect()
 
-    def reconnect(self) -> bool:
+        # 在调用方（请求）线程中只尝试一次，不进入退避等待；心跳线程运行时会每隔 heartbeat_interval 秒继续重连
+        logger.warning("连接已断开，尝试重连...")
+        return self.reconnect(force=False, max_retries=0)
+
+    def reconnect(self, force: bool = True, max_retries: Optional[int] = None) -> bool:
         """
-        重新连接XTTrader
-        
+        重新连接XTTrader，失败时按指数退避（带随机抖动）重试
+
+        Args:
+            force: 为False时，如果等锁期间其他线程已重连成功则直接返回
+            max_retries: 首次失败后的最大重试次数，默认为实例的 max_retries；为0时只尝试一次、不等待
+
         Returns:
             是否重连成功
         """
+        if max_retries is None:
+            max_retries = self.max_retries
+
         with self._reconnect_lock:
+            if not force and self._connected_ok.is_set():
+                return True
+
+            self._stop_reconnect.clear()
             if self.is_connected:
                 try:
-                    self.disconnect()
+                    self._close_session()
                 except Exception as e:
-                    logger.warning(f"断开旧连接时出错: {e}")
-            
-            logger.info("开始重连XTTrader...")
-            return self.connect()
-
+                    logger.warning("断开旧连接时出错: %s", e)
+
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    delay = min(self.max_backoff, RECONNECT_INITIAL_DELAY * RECONNECT_BACKOFF_FACTOR ** (attempt - 1))
+                    delay += random.uniform(0, delay * 0.1)
+                    logger.warning("XTTrader重连失败，%.1f 秒后进行第 %s 次重试", delay, attempt)
+                    if self._stop_reconnect.wait(delay):
+                        logger.info("连接已主动断开，停止重连")
+                        return False
+
+                logger.info("开始重连XTTrader...")
+                if self.connect():
+                    return True
+
+            logger.error("XTTrader重连失败，已重试 %s 次", max_retries)
+            return False
 
     def place_order(
         self,
@@ -277,6 +677,15 @@ class XTTraderClient:
             }
 
         # 参数验证
+        if _to_xt_stock_code(stock_code) is None:
+            error_msg = f"股票代码格式错误: {stock_code}"
+            logger.error(error_msg)
+            return {
+                'success': False,
+                'order_id': None,
+                'message': error_msg
+            }
+
         if price <= 0:
             error_msg = f"价格必须大于0，当前价格: {price}"
             logger.error(error_msg)
@@ -296,11 +705,8 @@ class XTTraderClient:
             }
 
         # 确定交易方向
-        if direction.lower() == "buy":
-            stock_side = xtconstant.STOCK_BUY if not self.is_mock_mode else "BUY"
-        elif direction.lower() == "sell":
-            stock_side = xtconstant.STOCK_SELL if not self.is_mock_mode else "SELL"
-        else:
+        stock_side = self._side_map.get(direction.lower())
+        if stock_side is None:
             error_msg = f"交易方向必须是'buy'或'sell'，当前: {direction}"
             logger.error(error_msg)
             return {
@@ -309,10 +715,39 @@ class XTTraderClient:
                 'message': error_msg
             }
 
+        return self._place_order_unchecked(stock_code, price, volume, stock_side, direction, strategy_name, remark)
+
+    def _place_order_unchecked(
+        self,
+        stock_code: str,
+        price: float,
+        volume: int,
+        stock_side: Any = None,
+        direction: str = "buy",
+        strategy_name: str = "strategy1",
+        remark: str = "",
+        log_level: int = logging.INFO
+    ) -> Dict[str, Any]:
+        """
+        下单，不检查连接和参数（由调用方保证，如批量下单已统一检查连接并预校验过订单）
+
+        Args:
+            stock_code: 股票代码
+            price: 价格
+            volume: 数量（股）
+            stock_side: xtconstant 交易方向，默认为买入
+            direction: 交易方向（仅用于日志）
+            strategy_name: 策略名称
+            remark: 备注
+            log_level: 下单成功日志的级别（批量下单时为 DEBUG，整批只记一行汇总）
+
+        Returns:
+            订单结果字典，包含 success, order_id, message
+        """
         # 模拟模式
         if self.is_mock_mode:
-            order_id = f"MOCK_{stock_code}_{int(time.time())}"
-            logger.info(f"模拟下单: {stock_code}, 方向: {direction}, 价格: {price}, 数量: {volume}, 订单ID: {order_id}")
+            order_id = f"MOCK_{stock_code}_{next(self._mock_seq)}"
+            logger.log(log_level, _MOCK_ORDER_LOG, stock_code, direction, price, volume, order_id)
             return {
                 'success': True,
                 'order_id': order_id,
@@ -320,20 +755,30 @@ class XTTraderClient:
             }
 
         # 实际下单
+        if stock_side is None:
+            stock_side = self._side_map['buy']
         try:
-            if len(stock_code.split('.')) == 2:
-                stock_code = stock_code.split('.')[1] + '.' + stock_code.split('.')[0]
-            order_id = self.xttrader.order_stock(
-                self.account,
-                stock_code,
-                stock_side,
-                volume,
-                xtconstant.FIX_PRICE,
-                price,
-                strategy_name,
-                remark or 'order_test'
+            stock_code = _to_xt_stock_code(stock_code)
+            if self.use_async:
+                future = self._send_order_async(stock_code, stock_side, price, volume, strategy_name, remark)
+                order_id = self._wait_order_future(future)
+            else:
+                order_id = self._order_fn(
+                    self.account,
+                    stock_code,
+                    stock_side,
+                    volume,
+                    self._fix_price,
+                    price,
+                    strategy_name,
+                    remark or 'order_test'
+                )
+            self._invalidate_query_cache()
+            logger.log(
+                log_level,
+                "下单成功: %s, 方向: %s, 价格: %s, 数量: %s, 订单ID: %s",
+                stock_code, direction, price, volume, order_id
             )
-            logger.info(f"下单成功: {stock_code}, 方向: {direction}, 价格: {price}, 数量: {volume}, 订单ID: {order_id}")
             return {
                 'success': True,
                 'order_id': order_id,
@@ -348,6 +793,151 @@ class XTTraderClient:
                 'message': error_msg
             }
 
+    def _pair_order_future(self, seq: int, create: bool = True) -> Optional[Future]:
+        """
+        取得异步下单请求 seq 对应的 Future
+
+        下单方和回调线程都调用此方法：先到的一方创建并登记 Future，后到的一方将其取走，
+        因此回报先于下单方登记到达时也不会丢失。配对完成或已被放弃的 seq 不再创建
+        （重复或迟到的回报不会在 _pending_orders 中留下无人取走的 Future）。
+
+        Args:
+            seq: 异步下单请求序号
+            create: 尚未登记时是否创建；为False时返回None
+
+        Returns:
+            Future 对象，没有可用的 Future 时返回None
+        """
+        with self._pending_lock:
+            future = self._pending_orders.pop(seq, None)
+            if future is not None:
+                self._finish_seq(seq)
+            elif create and seq not in self._finished_seqs:
+                future = Future()
+                self._pending_orders[seq] = future
+            return future
+
+    def _finish_seq(self, seq: int):
+        """记录 seq 已完成配对或已被放弃（调用方需持有 _pending_lock）"""
+        if seq in self._finished_seqs:
+            return
+        self._finished_seqs.add(seq)
+        self._finished_order.append(seq)
+        if len(self._finished_order) > FINISHED_SEQ_LIMIT:
+            self._finished_seqs.discard(self._finished_order.popleft())
+
+    def _abandon_order_future(self, seq: int, future: Future):
+        """下单方放弃等待（Future 被取消）时注销 seq，之后到达的回报直接丢弃"""
+        with self._pending_lock:
+            if self._pending_orders.get(seq) is future:
+                del self._pending_orders[seq]
+            self._finish_seq(seq)
+
+    def _resolve_order_future(
+        self,
+        seq: int,
+        order_id: Optional[int] = None,
+        error_msg: Optional[str] = None,
+        pending_only: bool = False
+    ):
+        """
+        在回调线程中完成异步下单请求 seq 对应的 Future
+
+        Args:
+            seq: 异步下单请求序号
+            order_id: 订单编号（成功时）
+            error_msg: 错误信息（失败时）
+            pending_only: 仅当下单方已登记时才处理（用于同一请求可能重复推送的错误回报）
+        """
+        future = self._pair_order_future(seq, create=not pending_only)
+        # 已被等待超时取消的请求不再处理；标记为运行中后下单方也无法再取消
+        if future is None or future.done() or not future.set_running_or_notify_cancel():
+            return
+        if error_msg is None:
+            future.set_result(order_id)
+        else:
+            future.set_exception(RuntimeError(error_msg))
+
+    def _send_order_async(
+        self,
+        xt_stock_code: str,
+        stock_side: Any,
+        price: float,
+        volume: int,
+        strategy_name: str = "strategy1",
+        remark: str = ""
+    ) -> Future:
+        """
+        通过 order_stock_async 发出限价单请求，不等待回报
+
+        Args:
+            xt_stock_code: xtquant 格式的股票代码（如 600000.SH）
+            stock_side: xtconstant 交易方向
+
+        Returns:
+            回报到达后得到订单编号的 Future
+        """
+        self._acquire_inflight()
+        try:
+            seq = self.xttrader.order_stock_async(
+                self.account,
+                xt_stock_code,
+                stock_side,
+                volume,
+                self._fix_price,
+                price,
+                strategy_name,
+                remark or 'order_test'
+            )
+        except BaseException:
+            self._inflight.release()
+            raise
+        return self._track_order_future(seq)
+
+    def _acquire_inflight(self):
+        """占用一个在途请求名额，在途请求已满时阻塞等待，超时抛出 TimeoutError"""
+        if not self._inflight.acquire(timeout=ASYNC_ORDER_TIMEOUT):
+            raise TimeoutError(f"在途异步下单请求已达上限 {self.max_inflight}，{ASYNC_ORDER_TIMEOUT}秒内未释放")
+
+    def _track_order_future(self, seq: Optional[int]) -> Future:
+        """
+        取得已发出请求 seq 对应的 Future，并在其完成时释放占用的在途名额
+
+        Args:
+            seq: order_stock_async 的返回值，无效（None 或负数）时立即释放名额并返回失败的 Future
+
+        Returns:
+            Future 对象
+        """
+        if seq is None or seq < 0:
+            self._inflight.release()
+            future = Future()
+            future.set_exception(RuntimeError(f"order_stock_async 返回无效序号: {seq}"))
+            return future
+        future = self._pair_order_future(seq)
+        if future is None:  # 同一 seq 已配对过（不应发生），按失败处理
+            self._inflight.release()
+            future = Future()
+            future.set_exception(RuntimeError(f"order_stock_async 返回重复的序号: {seq}"))
+            return future
+        future.add_done_callback(lambda done: self._on_tracked_future_done(seq, done))
+        return future
+
+    def _on_tracked_future_done(self, seq: int, future: Future):
+        """异步下单的 Future 完成时释放在途名额；等待超时被取消的请求同时注销 seq"""
+        self._inflight.release()
+        if future.cancelled():
+            self._abandon_order_future(seq, future)
+
+    @staticmethod
+    def _wait_order_future(future: Future, timeout: Optional[float] = ASYNC_ORDER_TIMEOUT) -> Any:
+        """等待异步下单回报，超时时取消该 Future（释放在途名额）并抛出 TimeoutError"""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"{ASYNC_ORDER_TIMEOUT}秒内未收到异步下单回报") from None
+
     def _calculate_volume(self, amount: float, price: float) -> int:
         """
         根据金额和价格计算可购买的股数（向下取整到100的倍数）
@@ -361,91 +951,458 @@ class XTTraderClient:
         """
         if price <= 0:
             return 0
-        # 计算可以买多少股，向下取整到100的倍数
-        total_shares = int(amount / price)
-        return (total_shares // LOT_SIZE) * LOT_SIZE
+        # 金额和价格换算成整数分后用整数除法，避免 amount / price 恰为 999.9999... 时少算一手
+        amount_fen = round(amount * 100)
+        price_fen = round(price * 100)
+        if price_fen <= 0:
+            return 0
+        # 一手的金额（分）只除一次，直接得到手数
+        return amount_fen // (price_fen * LOT_SIZE) * LOT_SIZE
 
-    def batch_place_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _calculate_volumes(amounts: np.ndarray, prices: np.ndarray) -> np.ndarray:
         """
-        批量下单
+        _calculate_volume 的向量化版本：按整数分一次性计算各订单可购买的股数
+
+        Args:
+            amounts: 金额数组（float64）
+            prices: 价格数组（float64）
+
+        Returns:
+            股数数组（int64，100的倍数），价格或金额无效（非正数、NaN、无穷大）时为0
+        """
+        valid = (prices > 0) & (amounts > 0) & np.isfinite(prices) & np.isfinite(amounts)
+        price_fen = np.rint(np.where(valid, prices, 0.0) * 100).astype(np.int64)
+        amount_fen = np.rint(np.where(valid, amounts, 0.0) * 100).astype(np.int64)
+        valid &= price_fen > 0
+        volumes = amount_fen // np.where(valid, price_fen * LOT_SIZE, 1) * LOT_SIZE
+        volumes[~valid] = 0
+        return volumes
+
+    @staticmethod
+    def _check_batch_order(stock_code: str, price: float, amount: float, volume: int) -> Optional[str]:
+        """
+        校验批量下单中的单个订单
+
+        Returns:
+            错误信息，校验通过时返回None
+        """
+        if not stock_code:
+            return '股票代码不能为空'
+        if _to_xt_stock_code(stock_code) is None:
+            return f'股票代码格式错误: {stock_code}'
+        if not price > 0:  # 同时排除 NaN
+            return f'价格必须大于0，当前价格: {price}'
+        if not amount > 0:
+            return f'金额必须大于0，当前金额: {amount}'
+        if volume < MIN_LOT_SIZE:
+            return _insufficient_lot_message(price)
+        return None
+
+    def _prepare_batch_order(self, idx: int, order: Dict[str, Any]) -> PreparedOrder:
+        """
+        解析并校验批量下单中的单个订单，计算股数（不下单）
+
+        Args:
+            idx: 订单序号（从1开始，用于日志）
+            order: 订单，包含 stock_code, price, amount
+
+        Returns:
+            预校验后的订单
+        """
+        if not isinstance(order, dict):
+            logger.error("订单 %s 格式错误: %r", idx, order)
+            return order, '', 0.0, 0, '订单格式错误'
+
+        try:
+            stock_code, price, amount = _ORDER_FIELDS(order)
+        except KeyError:
+            stock_code, price, amount = order.get('stock_code', ''), order.get('price', 0), order.get('amount', 0)
+        # 无法转换的价格/金额按 NaN 处理，由 _check_batch_order 给出错误信息
+        stock_code, price, amount = _normalize_order_fields(stock_code, price, amount)
+
+        # 计算股数（链式比较同时排除 NaN 和无穷大）
+        volume = self._calculate_volume(amount, price) if 0 < price < inf and 0 < amount < inf else 0
+        return order, stock_code, price, volume, self._check_batch_order(stock_code, price, amount, volume)
+
+    def _prepare_batch_columns(
+        self,
+        orders: List[Dict[str, Any]],
+        stock_codes: List[str],
+        prices: np.ndarray,
+        amounts: np.ndarray
+    ) -> List[PreparedOrder]:
+        """
+        按列预校验订单：股数一次性向量化计算，只有错误信息逐个生成
+
+        Args:
+            orders: 原始订单（写入结果的 order 字段）
+            stock_codes: 股票代码列
+            prices: 价格列（float64，无法解析的为 NaN）
+            amounts: 金额列（float64，无法解析的为 NaN）
+
+        Returns:
+            预校验后的订单列表，顺序与输入一致
+        """
+        volumes = self._calculate_volumes(amounts, prices)
+        # 至少一手即说明价格和金额都是有效的正数；股票代码还需符合格式
+        valid = volumes >= MIN_LOT_SIZE
+        valid &= np.array([_to_xt_stock_code(code) is not None for code in stock_codes], dtype=bool)
+
+        check = self._check_batch_order
+        return [
+            (order, stock_code, price, volume,
+             None if ok else check(stock_code, price, amount, volume))
+            for order, stock_code, price, amount, volume, ok
+            in zip(orders, stock_codes, prices.tolist(), amounts.tolist(), volumes.tolist(), valid.tolist())
+        ]
+
+    def _prepare_batch_frame(self, orders: pd.DataFrame) -> List[PreparedOrder]:
+        """
+        按列预校验 DataFrame 形式的订单
+
+        Args:
+            orders: 包含 stock_code, price, amount 列的 DataFrame
+
+        Returns:
+            预校验后的订单列表，顺序与行顺序一致
+        """
+        stock_codes = orders['stock_code'].fillna('').astype(str).str.strip().tolist()
+        prices = pd.to_numeric(orders['price'], errors='coerce').to_numpy(dtype=np.float64)
+        amounts = pd.to_numeric(orders['amount'], errors='coerce').to_numpy(dtype=np.float64)
+        records = [
+            {'stock_code': stock_code, 'price': price, 'amount': amount}
+            for stock_code, price, amount in zip(stock_codes, prices.tolist(), amounts.tolist())
+        ]
+        return self._prepare_batch_columns(records, stock_codes, prices, amounts)
+
+    def _prepare_batch_list(self, orders: List[Dict[str, Any]]) -> List[PreparedOrder]:
+        """
+        按列预校验较大的订单列表（字段按 _normalize_order_fields 统一，与逐个校验结果一致）
 
         Args:
             orders: 订单列表，每个订单包含 stock_code, price, amount
 
         Returns:
-            订单结果列表，每个结果包含 order, success, order_id, volume, message
+            预校验后的订单列表，顺序与输入一致
+        """
+        dict_orders = [order for order in orders if isinstance(order, dict)]
+        if len(dict_orders) < len(orders):
+            # 非字典订单与逐个校验一样给出格式错误，其余订单按列校验后放回原位置
+            prepared = iter(self._prepare_batch_list(dict_orders) if dict_orders else ())
+            prepare = self._prepare_batch_order
+            return [
+                next(prepared) if isinstance(order, dict) else prepare(idx, order)
+                for idx, order in enumerate(orders, 1)
+            ]
+
+        try:
+            raw_fields = map(_ORDER_FIELDS, orders)
+            normalized = [_normalize_order_fields(*fields) for fields in raw_fields]
+        except KeyError:
+            normalized = [
+                _normalize_order_fields(order.get('stock_code', ''), order.get('price', 0), order.get('amount', 0))
+                for order in orders
+            ]
+
+        stock_codes, prices, amounts = zip(*normalized)
+        return self._prepare_batch_columns(
+            orders, list(stock_codes), np.array(prices, dtype=np.float64), np.array(amounts, dtype=np.float64)
+        )
+
+    def _batch_order_params(self, order: Dict[str, Any]) -> Tuple[Any, str, str, str]:
+        """
+        取得批量下单中订单自带的交易方向、策略名称和备注（未提供时与 place_order 的默认值相同）
+
+        Args:
+            order: 原始订单，可选包含 direction, strategy_name, remark
+
+        Returns:
+            (xtquant 交易方向, 交易方向, 策略名称, 备注)，交易方向无效时抛出 ValueError
+        """
+        direction = order.get('direction') or 'buy'
+        stock_side = self._side_map.get(direction.lower()) if isinstance(direction, str) else None
+        if stock_side is None:
+            raise ValueError(f"交易方向必须是'buy'或'sell'，当前: {direction}")
+        return stock_side, direction, order.get('strategy_name') or 'strategy1', order.get('remark') or ''
+
+    def _submit_batch_order(self, prepared: PreparedOrder) -> OrderResult:
+        """提交一个已通过预校验的订单（调用方已检查连接），返回订单结果"""
+        order, stock_code, price, volume, _ = prepared
+        try:
+            stock_side, direction, strategy_name, remark = self._batch_order_params(order)
+        except ValueError as e:
+            logger.error("%s", e)
+            return OrderResult(order, False, None, volume, str(e))
+        result = self._place_order_unchecked(
+            stock_code, price, volume, stock_side, direction, strategy_name, remark, log_level=logging.DEBUG
+        )
+        return OrderResult(order, result['success'], result.get('order_id'), volume, result['message'])
+
+    def _submit_batch_sequential(self, to_submit: List[PreparedOrder]) -> List[OrderResult]:
+        """
+        在当前线程中逐个提交订单（调用方已检查连接）
+
+        某个订单失败且连接已被标记为断开时重新检查一次连接，
+        仍未恢复则其余订单直接判为失败，不再逐个调用下单接口。
+
+        Args:
+            to_submit: 已通过预校验的订单
+
+        Returns:
+            订单结果列表，顺序与 to_submit 一致
+        """
+        results: List[OrderResult] = []
+        for i, prepared in enumerate(to_submit):
+            result = self._submit_batch_order(prepared)
+            results.append(result)
+            if not result.success and not self._connected_ok.is_set() and not self.check_connection():
+                results.extend(self._disconnected_results(to_submit[i + 1:]))
+                break
+        return results
+
+    def _submit_batch_async(self, to_submit: List[PreparedOrder]) -> List[OrderResult]:
+        """
+        用 order_stock_async 一次性发出全部买单，再统一等待回报
+
+        Args:
+            to_submit: 已通过预校验的订单（调用方已检查连接）
+
+        Returns:
+            订单结果列表，顺序与 to_submit 一致
+        """
+        futures = self._submit_burst(to_submit)
+        wait(futures, timeout=ASYNC_ORDER_TIMEOUT)
+        self._invalidate_query_cache()
+
+        # 结果列表按订单数预先分配，按位置写入
+        results: List[Optional[OrderResult]] = [None] * len(to_submit)
+        for i, ((order, stock_code, price, volume, _), future) in enumerate(zip(to_submit, futures)):
+            try:
+                order_id = self._wait_order_future(future, timeout=0)
+                logger.debug(
+                    "下单成功: %s, 方向: %s, 价格: %s, 数量: %s, 订单ID: %s",
+                    stock_code, order.get('direction') or 'buy', price, volume, order_id
+                )
+                results[i] = OrderResult(order, True, order_id, volume, '订单已提交')
+            except Exception as e:
+                error_msg = f"下单失败: {e}"
+                logger.error(error_msg)
+                results[i] = OrderResult(order, False, None, volume, error_msg)
+        return results
+
+    def _submit_burst(self, to_submit: List[PreparedOrder]) -> List[Future]:
+        """
+        在紧凑的循环中为全部订单调用 order_stock_async（不等待回报）
+
+        在途名额在 _submit_lock 外获取：先阻塞等到一个名额，再不阻塞地尽量多取，
+        取到名额的这一段订单持锁连续发出，等待名额时不会挡住其他批次的提交。
+        交易方向、策略名称和备注取自各订单（见 _batch_order_params）。
+
+        Args:
+            to_submit: 已通过预校验的订单
+
+        Returns:
+            各订单回报的 Future，顺序与 to_submit 一致
+        """
+        account = self.account
+        order_stock_async = self.xttrader.order_stock_async
+        try_acquire, release = self._inflight.acquire, self._inflight.release
+        track_future = self._track_order_future
+        order_params, fix_price = self._batch_order_params, self._fix_price
+        to_xt_stock_code = _to_xt_stock_code
+
+        futures: List[Optional[Future]] = [None] * len(to_submit)
+        start = 0
+        while start < len(to_submit):
+            try:
+                self._acquire_inflight()
+            except TimeoutError as e:
+                futures[start] = self._failed_future(e)
+                start += 1
+                continue
+            end = start + 1
+            while end < len(to_submit) and try_acquire(blocking=False):
+                end += 1
+
+            # start 到 end 的每个订单都已占用一个在途名额
+            with self._submit_lock:
+                for i in range(start, end):
+                    order, stock_code, price, volume, _ = to_submit[i]
+                    try:
+                        stock_side, _, strategy_name, remark = order_params(order)
+                        seq = order_stock_async(
+                            account, to_xt_stock_code(stock_code), stock_side, volume, fix_price, price,
+                            strategy_name, remark or 'order_test'
+                        )
+                    except Exception as e:
+                        release()
+                        futures[i] = self._failed_future(e)
+                        continue
+                    except BaseException:
+                        # 中断时释放本段其余订单占用的名额
+                        for _ in range(i, end):
+                            release()
+                        raise
+                    futures[i] = track_future(seq)
+            start = end
+        return futures
+
+    @staticmethod
+    def _failed_future(error: BaseException) -> Future:
+        """创建以 error 失败的 Future"""
+        future = Future()
+        future.set_exception(error)
+        return future
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取（必要时创建）批量下单线程池"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='xt-order'
+                    )
+        return self._executor
+
+    def _split_batch(
+        self,
+        orders: Union[List[Dict[str, Any]], pd.DataFrame]
+    ) -> Tuple[List[Optional[OrderResult]], List[int], List[PreparedOrder]]:
+        """
+        预校验批量订单，校验失败的订单直接生成结果
+
+        Returns:
+            (结果列表（待提交的位置为None）, 待提交订单在结果中的位置, 待提交订单)
         """
-        if not orders:
+        if isinstance(orders, pd.DataFrame):
+            prepared_orders = self._prepare_batch_frame(orders)
+        elif len(orders) >= VECTORIZE_MIN_BATCH:
+            prepared_orders = self._prepare_batch_list(orders)
+        else:
+            prepare = self._prepare_batch_order
+            prepared_orders = [prepare(idx, order) for idx, order in enumerate(orders, 1)]
+
+        # 校验失败的订单直接生成结果，其余按原位置记录待提交
+        results: List[Optional[OrderResult]] = [None] * len(prepared_orders)
+        positions, to_submit = [], []
+        for position, prepared in enumerate(prepared_orders):
+            error_msg = prepared[4]
+            if error_msg is not None:
+                results[position] = OrderResult(prepared[0], False, message=error_msg)
+            else:
+                positions.append(position)
+                to_submit.append(prepared)
+        return results, positions, to_submit
+
+    @staticmethod
+    def _disconnected_results(to_submit: List[PreparedOrder]) -> List[OrderResult]:
+        """连接失败时，为全部待提交订单生成失败结果"""
+        error_msg = "未连接到XTTrader，重连失败"
+        logger.error(error_msg)
+        return [OrderResult(order, False, None, volume, error_msg) for order, _, _, volume, _ in to_submit]
+
+    @staticmethod
+    def _merge_batch_results(
+        results: List[Optional[OrderResult]],
+        positions: List[int],
+        submitted,
+        started: float
+    ) -> List[OrderResult]:
+        """
+        把提交结果按原位置填回结果列表，并记录整批的汇总日志（逐单的成功日志为 DEBUG 级别）
+
+        Args:
+            results: 预校验后的结果列表，待提交订单的位置为None
+            positions: 待提交订单在结果列表中的位置
+            submitted: 提交结果，顺序与 positions 一致
+            started: 批量下单开始时的 time.perf_counter()
+        """
+        for position, result in zip(positions, submitted):
+            results[position] = result
+
+        success_count = sum(1 for r in results if r.success)
+        logger.info(
+            "批量下单完成: 共 %s 个, 成功 %s, 失败 %s, 耗时 %.1f ms",
+            len(results), success_count, len(results) - success_count,
+            (time.perf_counter() - started) * 1000
+        )
+        return results
+
+    def batch_place_orders(
+        self,
+        orders: Union[List[Dict[str, Any]], pd.DataFrame]
+    ) -> List[OrderResult]:
+        """
+        批量下单
+
+        先在当前线程中逐个校验并计算股数，统一检查一次连接，再提交通过校验的订单：
+        实盘模式下多个订单默认用 order_stock_async 一次性发出、再按 seq 统一收取回报
+        （batch_async=False 时在线程池中并行调用阻塞的 order_stock），模拟模式下顺序提交。
+
+        Args:
+            orders: 订单列表，每个订单包含 stock_code, price, amount，
+                    可选 direction, strategy_name, remark（默认与 place_order 相同）；
+                    也可以是包含前三列的 DataFrame（股数按列向量化计算）
+
+        Returns:
+            OrderResult 列表（顺序与输入一致），包含 order, success, order_id, volume, message，
+            需要字典时调用 as_dict()
+        """
+        if len(orders) == 0:
             logger.warning("批量下单：订单列表为空")
             return []
 
-        results = []
-        logger.info(f"开始批量下单，共 {len(orders)} 个订单")
+        started = time.perf_counter()
+        logger.info("开始批量下单，共 %s 个订单", len(orders))
+        results, positions, to_submit = self._split_batch(orders)
 
-        for idx, order in enumerate(orders, 1):
-            try:
-                stock_code = order.get('stock_code', '').strip()
-                price = float(order.get('price', 0))
-                amount = float(order.get('amount', 0))
-
-                # 参数验证
-                if not stock_code:
-                    results.append({
-                        'order': order,
-                        'success': False,
-                        'message': '股票代码不能为空'
-                    })
-                    continue
+        # 整批只检查一次连接，之后逐个提交时不再重复检查
+        if to_submit and not self.check_connection():
+            submitted = self._disconnected_results(to_submit)
+        elif len(to_submit) > 1 and not self.is_mock_mode:
+            if self.batch_async:
+                submitted = self._submit_batch_async(to_submit)
+            else:
+                submitted = self._get_executor().map(self._submit_batch_order, to_submit)
+        else:
+            submitted = self._submit_batch_sequential(to_submit)
 
-                if price <= 0:
-                    results.append({
-                        'order': order,
-                        'success': False,
-                        'message': f'价格必须大于0，当前价格: {price}'
-                    })
-                    continue
+        return self._merge_batch_results(results, positions, submitted, started)
 
-                if amount <= 0:
-                    results.append({
-                        'order': order,
-                        'success': False,
-                        'message': f'金额必须大于0，当前金额: {amount}'
-                    })
-                    continue
+    async def batch_place_orders_async(
+        self,
+        orders: Union[List[Dict[str, Any]], pd.DataFrame]
+    ) -> List[OrderResult]:
+        """
+        批量下单（协程版本，供 async 路由直接 await）
 
-                # 计算股数
-                volume = self._calculate_volume(amount, price)
+        阻塞的 xtquant 调用放到下单线程池中执行，等待期间不阻塞事件循环；参数和返回值与 batch_place_orders 相同。
+        同时提交的订单数由实例共用的下单线程池（max_workers）限制，并发的多个批次也共用这一上限；
+        已发出、尚未收到回报的异步请求数另由实例级的在途名额（max_inflight）限制。
+        """
+        if self.is_mock_mode or len(orders) == 0:
+            # 模拟下单不涉及 I/O，直接在当前线程中完成
+            return self.batch_place_orders(orders)
 
-                if volume < MIN_LOT_SIZE:
-                    min_amount = price * MIN_LOT_SIZE
-                    results.append({
-                        'order': order,
-                        'success': False,
-                        'message': f'金额不足一手（需要至少 {min_amount:.2f} 元）'
-                    })
-                    continue
+        started = time.perf_counter()
+        logger.info("开始批量下单，共 %s 个订单", len(orders))
+        results, positions, to_submit = self._split_batch(orders)
 
-                # 下单
-                result = self.place_order(stock_code, price, volume)
-                results.append({
-                    'order': order,
-                    'success': result['success'],
-                    'order_id': result.get('order_id'),
-                    'volume': volume,
-                    'message': result['message']
-                })
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
 
-            except (ValueError, KeyError) as e:
-                logger.error(f"处理订单 {idx} 时出错: {e}")
-                results.append({
-                    'order': order,
-                    'success': False,
-                    'message': f'订单参数错误: {str(e)}'
-                })
+        if to_submit and not await loop.run_in_executor(executor, self.check_connection):
+            submitted = self._disconnected_results(to_submit)
+        elif self.batch_async:
+            submitted = await loop.run_in_executor(executor, self._submit_batch_async, to_submit)
+        else:
+            submitted = await asyncio.gather(*(
+                loop.run_in_executor(executor, self._submit_batch_order, prepared) for prepared in to_submit
+            ))
 
-        success_count = sum(1 for r in results if r['success'])
-        logger.info(f"批量下单完成: 成功 {success_count}/{len(orders)}")
-        return results
+        return self._merge_batch_results(results, positions, submitted, started)
 
     def cancel_order(self, order_id: Any) -> Dict[str, Any]:
         """
@@ -467,7 +1424,7 @@ class XTTraderClient:
             }
 
         if self.is_mock_mode:
-            logger.info(f"模拟撤单: 订单ID={order_id}")
+            logger.info("模拟撤单: 订单ID=%s", order_id)
             return {
                 'success': True,
                 'message': '模拟撤单已提交'
@@ -476,7 +1433,8 @@ class XTTraderClient:
         try:
             cancel_result = self.xttrader.cancel_order_stock(self.account, order_id)
             if cancel_result == 0:
-                logger.info(f"撤单成功: 订单ID={order_id}")
+                self._invalidate_query_cache()
+                logger.info("撤单成功: 订单ID=%s", order_id)
                 return {
                     'success': True,
                     'message': '撤单已提交'
@@ -517,8 +1475,9 @@ class XTTraderClient:
             remark: 备注
 
         Returns:
-            下单结果字典，包含 success, seq, message
-            注意：seq是下单请求序号，可以和on_order_stock_async_response的委托反馈response对应起来
+            下单结果字典，包含 success, seq, future, message
+            注意：seq是下单请求序号，可以和on_order_stock_async_response的委托反馈response对应起来；
+            实盘模式下 future 在该回报到达后得到订单编号（模拟模式下无此字段）
         """
         # 检查并确保连接
         if not self.check_connection():
@@ -531,6 +1490,15 @@ class XTTraderClient:
             }
 
         # 参数验证
+        if _to_xt_stock_code(stock_code) is None:
+            error_msg = f"股票代码格式错误: {stock_code}"
+            logger.error(error_msg)
+            return {
+                'success': False,
+                'seq': None,
+                'message': error_msg
+            }
+
         if price <= 0:
             error_msg = f"价格必须大于0，当前价格: {price}"
             logger.error(error_msg)
@@ -550,11 +1518,8 @@ class XTTraderClient:
             }
 
         # 确定交易方向
-        if direction.lower() == "buy":
-            stock_side = xtconstant.STOCK_BUY if not self.is_mock_mode else "BUY"
-        elif direction.lower() == "sell":
-            stock_side = xtconstant.STOCK_SELL if not self.is_mock_mode else "SELL"
-        else:
+        stock_side = self._side_map.get(direction.lower())
+        if stock_side is None:
             error_msg = f"交易方向必须是'buy'或'sell'，当前: {direction}"
             logger.error(error_msg)
             return {
@@ -564,8 +1529,8 @@ class XTTraderClient:
             }
 
         if self.is_mock_mode:
-            seq = int(time.time())
-            logger.info(f"模拟异步下单: {stock_code}, 方向: {direction}, 价格: {price}, 数量: {volume}, 序列号: {seq}")
+            seq = next(self._mock_seq)
+            logger.info(_MOCK_ASYNC_ORDER_LOG, stock_code, direction, price, volume, seq)
             return {
                 'success': True,
                 'seq': seq,
@@ -575,18 +1540,23 @@ class XTTraderClient:
         try:
             seq = self.xttrader.order_stock_async(
                 self.account,
-                stock_code,
+                _to_xt_stock_code(stock_code),
                 stock_side,
                 volume,
-                xtconstant.FIX_PRICE,
+                self._fix_price,
                 price,
                 strategy_name,
                 remark or 'order_test'
             )
-            logger.info(f"异步下单成功: {stock_code}, 方向: {direction}, 价格: {price}, 数量: {volume}, 序列号: {seq}")
+            logger.info(
+                "异步下单成功: %s, 方向: %s, 价格: %s, 数量: %s, 序列号: %s",
+                stock_code, direction, price, volume, seq
+            )
             return {
                 'success': True,
                 'seq': seq,
+                # 与 on_order_stock_async_response 对应，回报到达后得到订单编号
+                'future': self._pair_order_future(seq) if seq is not None and seq >= 0 else None,
                 'message': '异步订单已提交'
             }
         except Exception as e:
@@ -605,11 +1575,15 @@ class XTTraderClient:
         Returns:
             资产信息字典，包含 cash 等字段，如果查询失败返回None
         """
-        # 检查并确保连接
+        # 检查并确保连接（断开时不返回缓存的旧结果）
         if not self.check_connection():
             logger.error("未连接到XTTrader，重连失败")
             return None
 
+        cached = self._cached_query('asset')
+        if cached is not None:
+            return cached
+
         if self.is_mock_mode:
             logger.info("模拟模式：查询资产")
             return {
@@ -626,13 +1600,14 @@ class XTTraderClient:
                     'total_asset': getattr(asset, 'total_asset', asset.cash),
                     'market_value': getattr(asset, 'market_value', 0.0)
                 }
-                logger.info(f"查询资产成功: 现金={result['cash']}")
+                self._store_query('asset', result)
+                logger.info("查询资产成功: 现金=%s", result['cash'])
                 return result
             else:
                 logger.warning("查询资产返回空结果")
                 return None
         except Exception as e:
-            logger.error(f"查询资产失败: {e}", exc_info=True)
+            logger.error("查询资产失败: %s", e, exc_info=True)
             return None
 
     def query_order(self, order_id: Any) -> Optional[Dict[str, Any]]:
@@ -651,7 +1626,7 @@ class XTTraderClient:
             return None
 
         if self.is_mock_mode:
-            logger.info(f"模拟模式：查询订单 {order_id}")
+            logger.info("模拟模式：查询订单 %s", order_id)
             return {
                 'order_id': order_id,
                 'stock_code': '000001.SZ',
@@ -670,15 +1645,96 @@ class XTTraderClient:
                     'order_status': getattr(order, 'order_status', None),
                     'order_sysid': getattr(order, 'order_sysid', None)
                 }
-                logger.info(f"查询订单成功: 订单ID={order_id}")
+                logger.info("查询订单成功: 订单ID=%s", order_id)
                 return result
             else:
-                logger.warning(f"查询订单返回空结果: 订单ID={order_id}")
+                logger.warning("查询订单返回空结果: 订单ID=%s", order_id)
                 return None
         except Exception as e:
-            logger.error(f"查询订单失败: {e}", exc_info=True)
+            logger.error("查询订单失败: %s", e, exc_info=True)
             return None
 
+    @staticmethod
+    def _order_to_dict(order: Any) -> Dict[str, Any]:
+        """委托对象转换为字典"""
+        return {
+            'order_id': order.order_id,
+            'stock_code': order.stock_code,
+            'order_volume': order.order_volume,
+            'price': order.price,
+            'order_status': getattr(order, 'order_status', None),
+            'order_sysid': getattr(order, 'order_sysid', None)
+        }
+
+    @staticmethod
+    def _trade_to_dict(trade: Any) -> Dict[str, Any]:
+        """成交对象转换为字典"""
+        return {
+            'account_id': trade.account_id,
+            'stock_code': trade.stock_code,
+            'order_id': trade.order_id,
+            'traded_volume': trade.traded_volume,
+            'traded_price': trade.traded_price
+        }
+
+    @staticmethod
+    def _position_to_dict(position: Any) -> Dict[str, Any]:
+        """持仓对象转换为字典"""
+        return {
+            'account_id': position.account_id,
+            'stock_code': position.stock_code,
+            'volume': position.volume,
+            'can_use_volume': getattr(position, 'can_use_volume', position.volume),
+            'avg_price': getattr(position, 'avg_price', 0.0)
+        }
+
+    def _iter_query(self, query_fn_name: str, convert) -> Iterator[Dict[str, Any]]:
+        """
+        逐条查询并转换为字典（iter_orders / iter_trades / iter_positions 的公共实现）
+
+        Args:
+            query_fn_name: XtQuantTrader 的查询方法名，如 query_stock_orders
+            convert: 查询结果中单个对象到字典的转换函数
+
+        Returns:
+            逐条产出字典的生成器；未连接或模拟模式下不产出任何结果，查询异常直接抛给调用方
+        """
+        if not self.check_connection():
+            logger.error("未连接到XTTrader，重连失败")
+            return
+        if self.is_mock_mode:
+            return
+        for item in getattr(self.xttrader, query_fn_name)(self.account):
+            yield convert(item)
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出当日委托（不构造完整列表，也不读写查询缓存），
+        适合只需要前几条或按条件找到第一条即停止的调用方，如 next(filter(...))
+
+        Returns:
+            委托信息字典的生成器
+        """
+        return self._iter_query('query_stock_orders', self._order_to_dict)
+
+    def iter_trades(self) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出当日成交（不构造完整列表，也不读写查询缓存）
+
+        Returns:
+            成交信息字典的生成器
+        """
+        return self._iter_query('query_stock_trades', self._trade_to_dict)
+
+    def iter_positions(self) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出当日持仓（不构造完整列表，也不读写查询缓存）
+
+        Returns:
+            持仓信息字典的生成器
+        """
+        return self._iter_query('query_stock_positions', self._position_to_dict)
+
     def query_orders(self) -> List[Dict[str, Any]]:
         """
         查询当日所有的委托
@@ -686,31 +1742,26 @@ class XTTraderClient:
         Returns:
             委托信息列表
         """
-        # 检查并确保连接
+        # 检查并确保连接（断开时不返回缓存的旧结果）
         if not self.check_connection():
             logger.error("未连接到XTTrader，重连失败")
             return []
 
+        cached = self._cached_query('orders')
+        if cached is not None:
+            return cached
+
         if self.is_mock_mode:
             logger.info("模拟模式：查询所有订单")
             return []
 
         try:
-            orders = self.xttrader.query_stock_orders(self.account)
-            results = []
-            for order in orders:
-                results.append({
-                    'order_id': order.order_id,
-                    'stock_code': order.stock_code,
-                    'order_volume': order.order_volume,
-                    'price': order.price,
-                    'order_status': getattr(order, 'order_status', None),
-                    'order_sysid': getattr(order, 'order_sysid', None)
-                })
-            logger.info(f"查询所有订单成功: 共 {len(results)} 条")
+            results = list(map(self._order_to_dict, self.xttrader.query_stock_orders(self.account)))
+            self._store_query('orders', results)
+            logger.info("查询所有订单成功: 共 %s 条", len(results))
             return results
         except Exception as e:
-            logger.error(f"查询所有订单失败: {e}", exc_info=True)
+            logger.error("查询所有订单失败: %s", e, exc_info=True)
             return []
 
     def query_trades(self) -> List[Dict[str, Any]]:
@@ -720,30 +1771,26 @@ class XTTraderClient:
         Returns:
             成交信息列表
         """
-        # 检查并确保连接
+        # 检查并确保连接（断开时不返回缓存的旧结果）
         if not self.check_connection():
             logger.error("未连接到XTTrader，重连失败")
             return []
 
+        cached = self._cached_query('trades')
+        if cached is not None:
+            return cached
+
         if self.is_mock_mode:
             logger.info("模拟模式：查询所有成交")
             return []
 
         try:
-            trades = self.xttrader.query_stock_trades(self.account)
-            results = []
-            for trade in trades:
-                results.append({
-                    'account_id': trade.account_id,
-                    'stock_code': trade.stock_code,
-                    'order_id': trade.order_id,
-                    'traded_volume': trade.traded_volume,
-                    'traded_price': trade.traded_price
-                })
-            logger.info(f"查询所有成交成功: 共 {len(results)} 条")
+            results = list(map(self._trade_to_dict, self.xttrader.query_stock_trades(self.account)))
+            self._store_query('trades', results)
+            logger.info("查询所有成交成功: 共 %s 条", len(results))
             return results
         except Exception as e:
-            logger.error(f"查询所有成交失败: {e}", exc_info=True)
+            logger.error("查询所有成交失败: %s", e, exc_info=True)
             return []
 
     def query_positions(self) -> List[Dict[str, Any]]:
@@ -753,30 +1800,26 @@ class XTTraderClient:
         Returns:
             持仓信息列表
         """
-        # 检查并确保连接
+        # 检查并确保连接（断开时不返回缓存的旧结果）
         if not self.check_connection():
             logger.error("未连接到XTTrader，重连失败")
             return []
 
+        cached = self._cached_query('positions')
+        if cached is not None:
+            return cached
+
         if self.is_mock_mode:
             logger.info("模拟模式：查询所有持仓")
             return []
 
         try:
-            positions = self.xttrader.query_stock_positions(self.account)
-            results = []
-            for position in positions:
-                results.append({
-                    'account_id': position.account_id,
-                    'stock_code': position.stock_code,
-                    'volume': position.volume,
-                    'can_use_volume': getattr(position, 'can_use_volume', position.volume),
-                    'avg_price': getattr(position, 'avg_price', 0.0)
-                })
-            logger.info(f"查询所有持仓成功: 共 {len(results)} 条")
+            results = list(map(self._position_to_dict, self.xttrader.query_stock_positions(self.account)))
+            self._store_query('positions', results)
+            logger.info("查询所有持仓成功: 共 %s 条", len(results))
             return results
         except Exception as e:
-            logger.error(f"查询所有持仓失败: {e}", exc_info=True)
+            logger.error("查询所有持仓失败: %s", e, exc_info=True)
             return []
 
     def query_position(self, stock_code: str) -> Optional[Dict[str, Any]]:
@@ -795,26 +1838,20 @@ class XTTraderClient:
             return None
 
         if self.is_mock_mode:
-            logger.info(f"模拟模式：查询持仓 {stock_code}")
+            logger.info("模拟模式：查询持仓 %s", stock_code)
             return None
 
         try:
             position = self.xttrader.query_stock_position(self.account, stock_code)
             if position:
-                result = {
-                    'account_id': position.account_id,
-                    'stock_code': position.stock_code,
-                    'volume': position.volume,
-                    'can_use_volume': getattr(position, 'can_use_volume', position.volume),
-                    'avg_price': getattr(position, 'avg_price', 0.0)
-                }
-                logger.info(f"查询持仓成功: {stock_code}, 数量={result['volume']}")
+                result = self._position_to_dict(position)
+                logger.info("查询持仓成功: %s, 数量=%s", stock_code, result['volume'])
                 return result
             else:
-                logger.info(f"查询持仓返回空结果: {stock_code}（可能没有持仓）")
+                logger.info("查询持仓返回空结果: %s（可能没有持仓）", stock_code)
                 return None
         except Exception as e:
-            logger.error(f"查询持仓失败: {e}", exc_info=True)
+            logger.error("查询持仓失败: %s", e, exc_info=True)
             return None
 
     def check_and_save_pending_orders(self, save_path: str = "pending_orders.json") -> List[Dict[str, Any]]:
@@ -827,9 +1864,11 @@ class XTTraderClient:
         Returns:
             保存的未成交订单列表
         """
-        from backend.utils import (
-            is_trading_day, get_market_close_time, save_pending_orders
-        )
+        # 与 app.py / strategy.py 一样按平级模块导入 utils，共用同一个模块（和其中的 baostock 会话）
+        try:
+            from utils import is_trading_day, get_market_close_time, save_pending_orders
+        except ImportError:  # backend 目录不在 sys.path 上（按 backend.xt_trader 导入）
+            from backend.utils import is_trading_day, get_market_close_time, save_pending_orders
         
         now = datetime.now()
         
@@ -843,7 +1882,7 @@ class XTTraderClient:
         check_time = close_time - timedelta(minutes=3)
         
         if now < check_time:
-            logger.info(f"还未到检查时间（收盘前3分钟），当前时间: {now.strftime('%H:%M:%S')}")
+            logger.info("还未到检查时间（收盘前3分钟），当前时间: %02d:%02d:%02d", now.hour, now.minute, now.second)
             return []
         
         if now > close_time:
@@ -879,9 +1918,9 @@ class XTTraderClient:
         # 保存到文件
         if pending_orders:
             if save_pending_orders(pending_orders, save_path):
-                logger.info(f"已保存 {len(pending_orders)} 个未成交订单到 {save_path}")
+                logger.info("已保存 %s 个未成交订单到 %s", len(pending_orders), save_path)
             else:
-                logger.error(f"保存未成交订单失败")
+                logger.error("保存未成交订单失败")
         else:
             logger.info("没有未成交的订单需要保存")
         
@@ -897,10 +1936,16 @@ class XTTraderClient:
         Returns:
             重新下单的结果列表
         """
-        from backend.utils import (
-            is_trading_day, get_market_open_time, get_next_trading_day,
-            load_pending_orders, clear_pending_orders
-        )
+        try:
+            from utils import (
+                is_trading_day, get_market_open_time, get_next_trading_day,
+                load_pending_orders, clear_pending_orders
+            )
+        except ImportError:  # backend 目录不在 sys.path 上（按 backend.xt_trader 导入）
+            from backend.utils import (
+                is_trading_day, get_market_open_time, get_next_trading_day,
+                load_pending_orders, clear_pending_orders
+            )
         
         now = datetime.now()
         
@@ -914,7 +1959,7 @@ class XTTraderClient:
         reload_time = open_time + timedelta(minutes=3)
         
         if now < reload_time:
-            logger.info(f"还未到重新下单时间（开盘后3分钟），当前时间: {now.strftime('%H:%M:%S')}")
+            logger.info("还未到重新下单时间（开盘后3分钟），当前时间: %02d:%02d:%02d", now.hour, now.minute, now.second)
             return []
         
         # 检查是否在开盘后10分钟内（避免重复执行）
@@ -931,7 +1976,7 @@ class XTTraderClient:
             logger.info("没有待重新下单的订单")
             return []
         
-        logger.info(f"找到 {len(pending_orders)} 个待重新下单的订单")
+        logger.info("找到 %s 个待重新下单的订单", len(pending_orders))
         
         results = []
         
@@ -957,12 +2002,15 @@ class XTTraderClient:
                 })
                 
                 if result['success']:
-                    logger.info(f"重新下单成功: {stock_code}, 价格: {price}, 数量: {volume}, 新订单ID: {result['order_id']}")
+                    logger.info(
+                        "重新下单成功: %s, 价格: %s, 数量: %s, 新订单ID: %s",
+                        stock_code, price, volume, result['order_id']
+                    )
                 else:
-                    logger.error(f"重新下单失败: {stock_code}, 原因: {result['message']}")
+                    logger.error("重新下单失败: %s, 原因: %s", stock_code, result['message'])
                 
             except Exception as e:
-                logger.error(f"处理订单时出错: {e}", exc_info=True)
+                logger.error("处理订单时出错: %s", e, exc_info=True)
                 results.append({
                     'original_order': order_info,
                     'new_order_result': {
@@ -982,6 +2030,10 @@ class XTTraderClient:
         """
         阻塞线程，接收交易推送
         注意：此方法会阻塞当前线程，通常用于主程序保持运行
+
+        交易推送由 xtquant 的交易线程回调，这里只是保持调用线程等待：每隔
+        RUN_FOREVER_POLL_INTERVAL 秒检查一次停止信号（期间仍可被 Ctrl+C 打断），
+        其他线程调用 disconnect() 后在一个间隔内返回。
         """
         if not self.is_connected:
             logger.error("未连接到XTTrader，请先调用connect()")
@@ -991,14 +2043,26 @@ class XTTraderClient:
             logger.info("模拟模式：run_forever() 不会阻塞")
             return
 
-        try:
-            logger.info("开始阻塞线程，接收交易推送...")
-            self.xttrader.run_forever()
-        except Exception as e:
-            logger.error(f"run_forever异常: {e}", exc_info=True)
+        self._stop_event.clear()
+        logger.info("开始阻塞线程，接收交易推送...")
+        while not self._stop_event.wait(RUN_FOREVER_POLL_INTERVAL):
+            pass
+        logger.info("run_forever() 已停止")
 
     def disconnect(self):
-        """断开连接"""
+        """断开连接（同时停止心跳线程，打断正在进行的重连，并结束 run_forever() 的等待）"""
+        self._stop_event.set()
+        self._stop_reconnect.set()
+        self._close_session()
+
+    def _close_session(self):
+        """断开当前连接并停止心跳线程"""
+        self._connected_ok.clear()
+        self._stop_heartbeat.set()
+        heartbeat_thread, self._heartbeat_thread = self._heartbeat_thread, None
+        if heartbeat_thread is not None and heartbeat_thread is not threading.current_thread():
+            heartbeat_thread.join()
+
         if not self.is_connected:
             logger.debug("未连接，无需断开")
             return
@@ -1013,7 +2077,7 @@ class XTTraderClient:
             self.is_connected = False
             logger.info("XTTrader已断开连接")
         except Exception as e:
-            logger.error(f"断开连接时出错: {e}", exc_info=True)
+            logger.error("断开连接时出错: %s", e, exc_info=True)
             self.is_connected = False
 
 
@@ -0,0 +1,147 @@
+"""
+测试脚本 - 测试订单存储（JSONL 日志、墓碑、压缩、旧版迁移、多实例同步）
+
+运行方式（在项目根目录执行）:
+    python -m unittest test_storage
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加backend目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import storage
+from storage import OrderStorage
+
+
+def _order(stock_code: str, total_amount: float) -> dict:
+    """构造一条测试订单数据"""
+    return {'stock_code': stock_code, 'total_amount': total_amount, 'orders': []}
+
+
+class OrderStorageTest(unittest.TestCase):
+    """OrderStorage 测试"""
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def _read_log(self) -> list:
+        """按行读取日志文件"""
+        with open(os.path.join(self.storage_dir, 'orders.jsonl'), encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_migrate_legacy_orders(self):
+        """旧版 orders.json 首次启动时转换为 JSONL，旧文件保留"""
+        legacy = [
+            {'order_id': '1', 'timestamp': '2024-01-01T09:30:00', 'data': _order('sh.600000', 100)},
+            {'order_id': '2', 'timestamp': '2024-01-02T09:30:00', 'data': _order('sz.000001', 200)},
+        ]
+        legacy_file = os.path.join(self.storage_dir, 'orders.json')
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f)
+
+        store = OrderStorage(self.storage_dir)
+
+        self.assertEqual(store.load_all_orders(), legacy)
+        self.assertEqual(self._read_log(), legacy)
+        self.assertTrue(os.path.exists(legacy_file))
+        self.assertEqual(store.get_statistics()['total_amount'], 300)
+
+    def test_save_and_query(self):
+        """保存后可按ID、股票和时间顺序查询"""
+        store = OrderStorage(self.storage_dir)
+        first = store.save_order(_order('sh.600000', 100))
+        second = store.save_order(_order('sh.600000', 200))
+        third = store.save_order(_order('sz.000001', 300))
+
+        self.assertLess(first, second)
+        self.assertEqual(store.get_order_by_id(second)['data']['total_amount'], 200)
+        self.assertEqual(
+            [r['order_id'] for r in store.get_orders_by_stock('sh.600000')], [first, second]
+        )
+        self.assertEqual([r['order_id'] for r in store.get_recent_orders(2)], [third, second])
+
+        stats = store.get_statistics()
+        self.assertEqual(stats['total_orders'], 3)
+        self.assertEqual(stats['total_stocks'], 2)
+        self.assertEqual(stats['total_amount'], 600)
+
+    def test_delete_appends_tombstone_and_replays(self):
+        """删除追加墓碑行，重新加载时回放墓碑"""
+        store = OrderStorage(self.storage_dir)
+        kept = store.save_order(_order('sh.600000', 100))
+        deleted = store.save_order(_order('sz.000001', 200))
+
+        self.assertTrue(store.delete_order(deleted))
+        self.assertFalse(store.delete_order(deleted))
+        self.assertEqual(self._read_log()[-1], {'deleted': deleted})
+
+        reloaded = OrderStorage(self.storage_dir)
+        self.assertEqual([r['order_id'] for r in reloaded.load_all_orders()], [kept])
+        self.assertEqual(reloaded.get_orders_by_stock('sz.000001'), [])
+        self.assertEqual(reloaded.get_statistics()['total_amount'], 100)
+
+    def test_compaction_drops_tombstones(self):
+        """墓碑达到阈值后重写日志，只保留有效记录"""
+        with mock.patch.object(storage, 'COMPACT_MIN_TOMBSTONES', 2):
+            store = OrderStorage(self.storage_dir)
+            ids = [store.save_order(_order('sh.600000', i)) for i in range(3)]
+
+            store.delete_order(ids[0])
+            self.assertEqual(len(self._read_log()), 4)  # 3条记录 + 1个墓碑
+
+            store.delete_order(ids[1])
+            log = self._read_log()
+
+        self.assertEqual([entry['order_id'] for entry in log], [ids[2]])
+        self.assertEqual(
+            [name for name in os.listdir(self.storage_dir) if name.endswith('.tmp')], []
+        )
+        self.assertEqual([r['order_id'] for r in OrderStorage(self.storage_dir).load_all_orders()], [ids[2]])
+
+    def test_second_instance_sees_writes(self):
+        """另一个实例（如另一个 gunicorn worker）的写入在下次访问时可见"""
+        first = OrderStorage(self.storage_dir)
+        second = OrderStorage(self.storage_dir)
+
+        order_id = first.save_order(_order('sh.600000', 100))
+        self.assertEqual(second.get_order_by_id(order_id)['data']['total_amount'], 100)
+
+        second.delete_order(order_id)
+        self.assertIsNone(first.get_order_by_id(order_id))
+        self.assertEqual(first.get_statistics()['total_orders'], 0)
+
+    def test_compaction_keeps_other_instance_appends(self):
+        """压缩前先读入其他实例的追加，重写不会丢失它们"""
+        with mock.patch.object(storage, 'COMPACT_MIN_TOMBSTONES', 1):
+            first = OrderStorage(self.storage_dir)
+            second = OrderStorage(self.storage_dir)
+
+            to_delete = first.save_order(_order('sh.600000', 100))
+            appended = second.save_order(_order('sz.000001', 200))
+            first.delete_order(to_delete)  # 触发压缩
+
+        reloaded = OrderStorage(self.storage_dir)
+        self.assertEqual([r['order_id'] for r in reloaded.load_all_orders()], [appended])
+
+    def test_skips_truncated_line(self):
+        """写入中断导致的残缺行被跳过，其余记录正常加载"""
+        store = OrderStorage(self.storage_dir)
+        order_id = store.save_order(_order('sh.600000', 100))
+        with open(os.path.join(self.storage_dir, 'orders.jsonl'), 'a', encoding='utf-8') as f:
+            f.write('{"order_id": "broken"')
+
+        reloaded = OrderStorage(self.storage_dir)
+        self.assertEqual([r['order_id'] for r in reloaded.load_all_orders()], [order_id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,94 +3,176 @@
 """
 import sys
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 # 添加backend目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from strategy import FibonacciPyramidStrategy
-from utils import validate_stock_code, format_money, calculate_shares
+from strategy import FibonacciPyramidStrategy, FIB_LEVEL_NAMES
+from order_cache import FileCache
+from utils import validate_stock_code, format_money, calculate_shares_batch
+
+
+# 每只股票的测试投资金额
+TOTAL_AMOUNT = 100000
+
+# 并行分析的最大线程数
+MAX_WORKERS = 8
+
+# 分隔线
+SEP_EQ = '=' * 60
+SEP_DASH = '-' * 70
+
+# 订单明细表头（与股票无关，只格式化一次）
+ORDER_TABLE_HEADER = (
+    "\n💼 订单明细:",
+    f"  {'阶段':<6} {'订单':<6} {'价格':<10} {'金额':<12} {'占比':<8} {'股数':<10}",
+    f"  {SEP_DASH}",
+)
+# 订单明细的行格式，参数依次为 阶段、序号、价格、金额、占比、股数
+ORDER_ROW_FORMAT = "  阶段{:<4} 第{}单  ¥{:<8.2f} ¥{:<10,.0f} {:<6.1f}% {:>8}股"
+
+
+def analyze(
+    strategy: FibonacciPyramidStrategy,
+    cache: FileCache,
+    stock_code: str
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    生成订单计划（在线程池中执行，不打印输出）
+
+    Args:
+        strategy: 策略对象（K线查询在 baostock 会话锁内进行，可在多个线程中共用）
+        cache: 订单计划缓存
+        stock_code: 已验证并标准化的股票代码
+
+    Returns:
+        (订单计划, 是否来自缓存)
+    """
+    cache_key = cache.make_key(stock_code, TOTAL_AMOUNT)
+    order_result = cache.get(cache_key)
+    if order_result is not None:
+        return order_result, True
+
+    order_result = strategy.generate_pyramid_orders(stock_code, TOTAL_AMOUNT)
+    cache.set(cache_key, order_result)
+    return order_result, False
+
+
+def format_result(stock_code: str, order_result: Dict[str, Any], from_cache: bool) -> List[str]:
+    """
+    格式化一只股票的订单计划（由调用方一次性写出）
+
+    Args:
+        stock_code: 标准化后的股票代码
+        order_result: generate_pyramid_orders 的结果
+        from_cache: 是否来自缓存
+
+    Returns:
+        输出的各行
+    """
+    out = [
+        f"✅ 标准化代码: {stock_code}",
+        f"💰 总投资金额: {format_money(TOTAL_AMOUNT)}"
+    ]
+    if from_cache:
+        out.append("（使用缓存的分析结果）")
+
+    # 显示涨停信息
+    limit_info = order_result['limit_up_info']
+    out.append(f"\n📊 涨停信息:")
+    out.append(f"  涨停日期: {limit_info['limit_up_date']}")
+    out.append(f"  涨停价格: ¥{limit_info['limit_up_price']:.2f}")
+    out.append(f"  最高价格: ¥{limit_info['highest_price']:.2f}")
+    out.append(f"  最低价格: ¥{limit_info['lowest_price']:.2f}")
+    out.append(f"  当前价格: ¥{limit_info['current_price']:.2f}")
+
+    # 显示斐波那契回调位（FIB_LEVEL_NAMES 已按回调比例从小到大排列，无需排序）
+    fib_levels = order_result['fibonacci_levels']
+    out.append(f"\n📐 斐波那契回调位:")
+    out += [f"  {level} 回调: ¥{fib_levels[level]:.2f}" for level in FIB_LEVEL_NAMES]
+
+    # 显示订单摘要
+    summary = order_result['summary']
+    out.append(f"\n📋 订单摘要:")
+    out.append(f"  总订单数: {summary['total_orders']}")
+    out.append(f"  第一阶段: {summary['stage1_orders']}单, {format_money(summary['stage1_amount'])}")
+    out.append(f"  第二阶段: {summary['stage2_orders']}单, {format_money(summary['stage2_amount'])}")
+
+    # 显示订单明细（表头为固定文本，见 ORDER_TABLE_HEADER）
+    out += ORDER_TABLE_HEADER
+
+    # 各订单股数一次性批量计算，各行用一个列表推导式格式化
+    orders = order_result['orders']
+    all_shares = calculate_shares_batch(
+        [order['amount'] for order in orders],
+        [order['price'] for order in orders]
+    ).tolist()
+
+    row = ORDER_ROW_FORMAT.format
+    out += [
+        row(order['stage'], order['order_no'], order['price'], order['amount'], order['percentage'], shares)
+        for order, shares in zip(orders, all_shares)
+    ]
+
+    return out
 
 
 def test_strategy():
     """测试策略"""
-    print("=" * 60)
+    print(SEP_EQ)
     print("斐波那契金字塔建仓策略测试")
-    print("=" * 60)
+    print(SEP_EQ)
 
     # 测试股票代码
     test_codes = ['600000', 'sh.600519', '000001', 'sz.000001', '300750']
 
     strategy = FibonacciPyramidStrategy()
+    # 同一交易日内重复运行时，订单计划直接从本地缓存读取
+    cache = FileCache()
+
+    # 先验证全部代码（validate_stock_code 按输入缓存），无效的代码不进入线程池，也不会触发 baostock 登录
+    validated = [validate_stock_code(code) for code in test_codes]
+
+    # 所有股票共用一个 baostock 会话（首次分析时登录），测试结束或中断时再登出
+    try:
+        # 有效的股票在线程池中同时分析，全部完成后再按输入顺序打印，输出顺序保持不变
+        futures: List[Optional[Future]] = [None] * len(test_codes)
+        valid_count = sum(valid for valid, _ in validated)
+        if valid_count:
+            print(f"\n🔍 正在分析 {valid_count} 只股票...")
+            # 本地缓存未命中的股票先在一次 baostock 会话锁内批量预取K线，分析时直接命中K线缓存
+            strategy.preload_bulk([
+                stock_code for valid, stock_code in validated
+                if valid and cache.get(cache.make_key(stock_code, TOTAL_AMOUNT)) is None
+            ])
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, valid_count)) as executor:
+                for i, (valid, stock_code) in enumerate(validated):
+                    if valid:
+                        futures[i] = executor.submit(analyze, strategy, cache, stock_code)
+
+        # 每只股票的输出先收集成行，再一次写出
+        for code, (valid, result), future in zip(test_codes, validated, futures):
+            out = [f"\n{SEP_EQ}", f"测试股票: {code}", SEP_EQ]
 
-    for code in test_codes:
-        print(f"\n{'=' * 60}")
-        print(f"测试股票: {code}")
-        print('=' * 60)
-
-        try:
-            # 验证代码
-            valid, result = validate_stock_code(code)
             if not valid:
-                print(f"❌ 股票代码无效: {result}")
-                continue
-
-            stock_code = result
-            total_amount = 100000
-
-            print(f"✅ 标准化代码: {stock_code}")
-            print(f"💰 总投资金额: {format_money(total_amount)}")
-
-            # 生成订单
-            print("\n🔍 正在分析...")
-            order_result = strategy.generate_pyramid_orders(stock_code, total_amount)
-
-            # 显示涨停信息
-            limit_info = order_result['limit_up_info']
-            print(f"\n📊 涨停信息:")
-            print(f"  涨停日期: {limit_info['limit_up_date']}")
-            print(f"  涨停价格: ¥{limit_info['limit_up_price']:.2f}")
-            print(f"  最高价格: ¥{limit_info['highest_price']:.2f}")
-            print(f"  最低价格: ¥{limit_info['lowest_price']:.2f}")
-            print(f"  当前价格: ¥{limit_info['current_price']:.2f}")
-
-            # 显示斐波那契回调位
-            fib_levels = order_result['fibonacci_levels']
-            print(f"\n📐 斐波那契回调位:")
-            for level, price in sorted(fib_levels.items()):
-                print(f"  {level} 回调: ¥{price:.2f}")
-
-            # 显示订单摘要
-            summary = order_result['summary']
-            print(f"\n📋 订单摘要:")
-            print(f"  总订单数: {summary['total_orders']}")
-            print(f"  第一阶段: {summary['stage1_orders']}单, {format_money(summary['stage1_amount'])}")
-            print(f"  第二阶段: {summary['stage2_orders']}单, {format_money(summary['stage2_amount'])}")
-
-            # 显示订单明细
-            print(f"\n💼 订单明细:")
-            print(f"  {'阶段':<6} {'订单':<6} {'价格':<10} {'金额':<12} {'占比':<8} {'股数':<10}")
-            print(f"  {'-' * 70}")
-
-            for order in order_result['orders']:
-                shares = calculate_shares(order['amount'], order['price'])
-                print(f"  阶段{order['stage']:<4} "
-                      f"第{order['order_no']}单  "
-                      f"¥{order['price']:<8.2f} "
-                      f"¥{order['amount']:<10,.0f} "
-                      f"{order['percentage']:<6.1f}% "
-                      f"{shares:>8}股")
-
-            print(f"\n✅ {code} 测试完成")
-
-        except Exception as e:
-            print(f"\n❌ 测试失败: {e}")
-
-        finally:
-            strategy.logout_baostock()
-
-    print(f"\n{'=' * 60}")
+                out.append(f"❌ 股票代码无效: {result}")
+            else:
+                try:
+                    order_result, from_cache = future.result()
+                    out += format_result(result, order_result, from_cache)
+                    out.append(f"\n✅ {code} 测试完成")
+                except Exception as e:
+                    out.append(f"\n❌ 测试失败: {e}")
+
+            sys.stdout.write('\n'.join(out) + '\n')
+    finally:
+        strategy.logout_baostock()
+
+    print(f"\n{SEP_EQ}")
     print("所有测试完成")
-    print('=' * 60)
+    print(SEP_EQ)
 
 
 if __name__ == '__main__':
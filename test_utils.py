@@ -0,0 +1,152 @@
+"""
+测试脚本 - 测试工具函数（金额格式化、交易日计算、待下单订单文件）
+
+运行方式（在项目根目录执行）:
+    python -m unittest test_utils
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加backend目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import utils
+from utils import (
+    format_money, format_money_vec, get_next_trading_day,
+    save_pending_orders, load_pending_orders, clear_pending_orders
+)
+
+
+class FormatMoneyTest(unittest.TestCase):
+    """format_money / format_money_vec 测试"""
+
+    CASES = [
+        (0, '0.00'),
+        (9999.5, '9999.50'),
+        (15000, '1.50万'),
+        (250000000, '2.50亿'),
+        # 负数按绝对值选择单位
+        (-9999.5, '-9999.50'),
+        (-15000, '-1.50万'),
+        (-250000000, '-2.50亿'),
+    ]
+
+    def test_format_money(self):
+        for amount, expected in self.CASES:
+            with self.subTest(amount=amount):
+                self.assertEqual(format_money(amount), expected)
+
+    def test_format_money_vec_matches_scalar(self):
+        amounts = [amount for amount, _ in self.CASES]
+        self.assertEqual(format_money_vec(amounts).tolist(), [format_money(a) for a in amounts])
+
+
+# 测试用节假日（工作日休市）
+HOLIDAYS = {
+    '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-07',
+    '2024-12-31', '2025-01-01',
+}
+
+
+def _fake_trade_dates(start_date: str, end_date: str) -> list:
+    """按 baostock 的行格式返回交易日历：周末和 HOLIDAYS 为非交易日"""
+    day = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    rows = []
+    while day <= end:
+        date_str = day.strftime('%Y-%m-%d')
+        trading = day.weekday() < 5 and date_str not in HOLIDAYS
+        rows.append([date_str, '1' if trading else '0'])
+        day += timedelta(days=1)
+    return rows
+
+
+class GetNextTradingDayTest(unittest.TestCase):
+    """get_next_trading_day 测试（替换 baostock 查询，不访问网络）"""
+
+    def setUp(self):
+        utils._trading_calendar.cache_clear()
+        utils._calendar_failures.clear()
+        patcher = mock.patch.object(utils, '_query_trade_dates', side_effect=_fake_trade_dates)
+        self.query = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(utils._trading_calendar.cache_clear)
+        self.addCleanup(utils._calendar_failures.clear)
+
+    def test_skips_weekend(self):
+        """周五的下一个交易日是周一"""
+        self.assertEqual(get_next_trading_day(datetime(2024, 9, 27)), datetime(2024, 9, 30))
+
+    def test_skips_holiday(self):
+        """跳过国庆休市"""
+        self.assertEqual(get_next_trading_day(datetime(2024, 9, 30)), datetime(2024, 10, 8))
+
+    def test_crosses_year_boundary(self):
+        """当年剩余日期都休市时接上下一年的日历"""
+        self.assertEqual(get_next_trading_day(datetime(2024, 12, 30)), datetime(2025, 1, 2))
+        self.assertEqual(get_next_trading_day(datetime(2024, 12, 31)), datetime(2025, 1, 2))
+
+    def test_calendar_cached_per_year(self):
+        """同一年份只查询一次交易日历"""
+        get_next_trading_day(datetime(2024, 9, 27))
+        get_next_trading_day(datetime(2024, 9, 30))
+        self.assertEqual(self.query.call_count, 1)
+
+    def test_query_failure_falls_back_to_weekday(self):
+        """查询失败时退化为只跳过周末"""
+        self.query.side_effect = RuntimeError('network down')
+        self.assertEqual(get_next_trading_day(datetime(2024, 9, 27)), datetime(2024, 9, 30))
+        self.assertEqual(get_next_trading_day(datetime(2024, 9, 30)), datetime(2024, 10, 1))
+
+    def test_query_failure_not_retried_immediately(self):
+        """查询失败后短时间内不再查询同一年份，超过重试间隔后重新查询"""
+        self.query.side_effect = RuntimeError('network down')
+        self.assertTrue(utils.is_trading_day(datetime(2024, 10, 1)))
+        self.assertTrue(utils.is_trading_day(datetime(2024, 10, 2)))
+        self.assertEqual(self.query.call_count, 1)
+
+        self.query.side_effect = _fake_trade_dates
+        with mock.patch.object(utils, 'CALENDAR_RETRY_INTERVAL', 0):
+            self.assertFalse(utils.is_trading_day(datetime(2024, 10, 1)))
+        self.assertEqual(self.query.call_count, 2)
+        self.assertEqual(utils._calendar_failures, {})
+
+
+class PendingOrdersTest(unittest.TestCase):
+    """待下单订单文件读写测试"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.data_dir, 'pending', 'pending_orders.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_save_load_clear(self):
+        """保存后可读回，不留下临时文件；清除后读取为空"""
+        orders = [{'stock_code': 'sh.600000', 'price': 10.5, 'amount': 10000}]
+
+        self.assertTrue(save_pending_orders(orders, self.file_path))
+        self.assertTrue(save_pending_orders(orders * 2, self.file_path))
+
+        self.assertEqual(load_pending_orders(self.file_path), orders * 2)
+        self.assertEqual(os.listdir(os.path.dirname(self.file_path)), ['pending_orders.json'])
+
+        self.assertTrue(clear_pending_orders(self.file_path))
+        self.assertEqual(load_pending_orders(self.file_path), [])
+
+    def test_save_failure_logged(self):
+        """写入失败时返回False并记录日志，不留下临时文件"""
+        with mock.patch.object(utils.os, 'replace', side_effect=OSError('disk full')):
+            with self.assertLogs('utils', level='ERROR'):
+                self.assertFalse(save_pending_orders([], self.file_path))
+        self.assertEqual(os.listdir(os.path.dirname(self.file_path)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
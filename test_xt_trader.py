@@ -0,0 +1,240 @@
+"""
+测试脚本 - 测试异步下单回报与 Future 的配对（按 seq 关联）、批量下单预校验和批量异步提交（不需要连接 QMT）
+
+运行方式（在项目根目录执行）:
+    python -m unittest test_xt_trader
+"""
+import itertools
+import os
+import sys
+import threading
+import unittest
+
+# 添加backend目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from xt_trader import VECTORIZE_MIN_BATCH, XTTraderClient
+
+
+class OrderFutureTest(unittest.TestCase):
+    """异步下单 seq -> Future 配对测试"""
+
+    def setUp(self):
+        # 在途名额设为1：名额未释放时无法再次获取，便于检查释放
+        self.client = XTTraderClient('', 'test_account', max_inflight=1)
+
+    def _submit(self, seq):
+        """模拟 _send_order_async：占用在途名额后按 seq 登记 Future"""
+        self.assertTrue(self.client._inflight.acquire(blocking=False))
+        return self.client._track_order_future(seq)
+
+    def _assert_inflight_released(self):
+        self.assertTrue(self.client._inflight.acquire(blocking=False))
+        self.client._inflight.release()
+
+    def test_response_after_submit(self):
+        """回报在登记之后到达"""
+        future = self._submit(1)
+        self.client._resolve_order_future(1, order_id=1001)
+
+        self.assertEqual(future.result(timeout=0), 1001)
+        self.assertEqual(self.client._pending_orders, {})
+        self._assert_inflight_released()
+
+    def test_response_before_submit(self):
+        """回报先于下单方登记到达时不会丢失"""
+        self.client._resolve_order_future(2, order_id=1002)
+        future = self._submit(2)
+
+        self.assertEqual(future.result(timeout=0), 1002)
+        self.assertEqual(self.client._pending_orders, {})
+        self._assert_inflight_released()
+
+    def test_error_response(self):
+        """被拒绝的回报以异常完成 Future"""
+        future = self._submit(3)
+        self.client._resolve_order_future(3, error_msg='资金不足')
+
+        with self.assertRaisesRegex(RuntimeError, '资金不足'):
+            future.result(timeout=0)
+        self._assert_inflight_released()
+
+    def test_duplicate_response_not_registered(self):
+        """配对完成后重复推送的回报不会留下无人取走的 Future"""
+        self._submit(4)
+        self.client._resolve_order_future(4, order_id=1004)
+        self.client._resolve_order_future(4, order_id=1004)
+
+        self.assertEqual(self.client._pending_orders, {})
+
+    def test_late_response_after_timeout(self):
+        """等待超时后放弃的请求：释放在途名额，迟到的回报直接丢弃"""
+        future = self._submit(5)
+        with self.assertRaises(TimeoutError):
+            self.client._wait_order_future(future, timeout=0.01)
+
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.client._pending_orders, {})
+        self._assert_inflight_released()
+
+        self.client._resolve_order_future(5, order_id=1005)
+        self.assertEqual(self.client._pending_orders, {})
+
+    def test_order_error_for_unknown_seq(self):
+        """委托失败推送只处理已登记的请求"""
+        self.client._resolve_order_future(6, error_msg='废单', pending_only=True)
+
+        self.assertEqual(self.client._pending_orders, {})
+
+    def test_invalid_seq(self):
+        """order_stock_async 返回无效序号时立即失败并释放名额"""
+        future = self._submit(-1)
+
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=0)
+        self._assert_inflight_released()
+
+
+def _valid_order() -> dict:
+    """构造一个能通过预校验的订单"""
+    return {'stock_code': 'sh.600000', 'price': 10.0, 'amount': 10000.0}
+
+
+class BatchPrepareTest(unittest.TestCase):
+    """批量下单预校验测试（不提交订单）"""
+
+    def setUp(self):
+        self.client = XTTraderClient('', 'test_account')
+
+    def _errors(self, orders: list) -> list:
+        """预校验订单，返回每个订单的错误信息（通过校验的为None）"""
+        results, _, _ = self.client._split_batch(orders)
+        return [None if result is None else result.message for result in results]
+
+    def test_malformed_order_in_large_batch(self):
+        """按列校验的大批量中混入非字典订单：只有该订单失败，结果与小批量一致"""
+        orders = [_valid_order() for _ in range(VECTORIZE_MIN_BATCH - 1)] + ['bad']
+        orders.insert(10, None)
+
+        errors = self._errors(orders)
+
+        self.assertEqual(len(errors), len(orders))
+        self.assertEqual(errors[10], '订单格式错误')
+        self.assertEqual(errors[-1], '订单格式错误')
+        self.assertEqual(errors.count(None), VECTORIZE_MIN_BATCH - 1)
+        self.assertEqual(self._errors([_valid_order(), 'bad']), [None, '订单格式错误'])
+
+    def test_same_result_for_small_and_large_batch(self):
+        """同一订单在逐个校验和按列校验下给出相同的结果"""
+        cases = [
+            {'stock_code': 600000, 'price': 10.0, 'amount': 10000.0},
+            {'stock_code': None, 'price': 10.0, 'amount': 10000.0},
+            {'stock_code': ' sh.600000 ', 'price': '10.5', 'amount': 10000},
+            {'stock_code': 'sh.600000', 'price': 'abc', 'amount': 10000.0},
+            {'stock_code': 'sh.600000', 'price': 10.0},
+            {'stock_code': 'sh.600000', 'price': 10.0, 'amount': 500.0},
+        ]
+        padding = [_valid_order() for _ in range(VECTORIZE_MIN_BATCH)]
+        for order in cases:
+            with self.subTest(order=order):
+                small = self._errors([order])[0]
+                large = self._errors([order] + padding)[0]
+                self.assertEqual(small, large)
+        self.assertEqual(self._errors([cases[0]]), ['股票代码不能为空'])
+        self.assertEqual(self._errors([cases[2]]), [None])
+
+    def test_all_malformed_large_batch(self):
+        """大批量中全部订单都不是字典"""
+        orders = ['bad'] * VECTORIZE_MIN_BATCH
+        self.assertEqual(self._errors(orders), ['订单格式错误'] * VECTORIZE_MIN_BATCH)
+
+
+class _FakeTrader:
+    """记录 order_stock_async 调用的假 XtQuantTrader；client 不为None时立即推送成功回报"""
+
+    def __init__(self, client=None):
+        self.client = client
+        self.calls = []
+        self._seqs = itertools.count(1)
+
+    def order_stock_async(self, *args):
+        seq = next(self._seqs)
+        self.calls.append(args)
+        if self.client is not None:
+            self.client._resolve_order_future(seq, order_id=1000 + seq)
+        return seq
+
+
+class SubmitBurstTest(unittest.TestCase):
+    """批量异步下单 _submit_burst 测试"""
+
+    def _client(self, max_inflight: int, trader: _FakeTrader) -> XTTraderClient:
+        client = XTTraderClient('', 'test_account', max_inflight=max_inflight)
+        client.xttrader = trader
+        client.account = 'account'
+        client._fix_price = 'FIX_PRICE'
+        return client
+
+    def test_uses_each_order_params(self):
+        """交易方向、策略名称和备注取自各订单，方向无效的订单失败并释放名额"""
+        trader = _FakeTrader()
+        client = self._client(3, trader)
+        to_submit = [
+            ({'direction': 'sell', 'strategy_name': 'grid', 'remark': 'r1'}, 'sh.600000', 10.0, 100, None),
+            ({}, 'sz.000001', 5.0, 200, None),
+            ({'direction': 'hold'}, 'sz.000001', 5.0, 200, None),
+        ]
+
+        futures = client._submit_burst(to_submit)
+
+        self.assertEqual(trader.calls, [
+            ('account', '600000.SH', 'SELL', 100, 'FIX_PRICE', 10.0, 'grid', 'r1'),
+            ('account', '000001.SZ', 'BUY', 200, 'FIX_PRICE', 5.0, 'strategy1', 'order_test'),
+        ])
+        with self.assertRaisesRegex(ValueError, '交易方向'):
+            futures[2].result(timeout=0)
+
+        client._resolve_order_future(1, order_id=1001)
+        client._resolve_order_future(2, order_id=1002)
+        self.assertEqual([future.result(timeout=0) for future in futures[:2]], [1001, 1002])
+        for _ in range(3):
+            self.assertTrue(client._inflight.acquire(blocking=False))
+
+    def test_more_orders_than_inflight_slots(self):
+        """订单数超过在途名额时，回报释放名额后继续发出"""
+        trader = _FakeTrader()
+        client = self._client(1, trader)
+        trader.client = client
+        to_submit = [({}, 'sh.600000', 10.0, 100, None)] * 3
+
+        futures = client._submit_burst(to_submit)
+
+        self.assertEqual([future.result(timeout=0) for future in futures], [1001, 1002, 1003])
+
+    def test_waits_for_slot_without_submit_lock(self):
+        """等待在途名额时不持有 _submit_lock"""
+        trader = _FakeTrader()
+        client = self._client(1, trader)
+        self.assertTrue(client._inflight.acquire(blocking=False))  # 名额被其他请求占用
+
+        submitted = []
+        worker = threading.Thread(
+            target=lambda: submitted.extend(client._submit_burst([({}, 'sh.600000', 10.0, 100, None)]))
+        )
+        worker.start()
+        try:
+            worker.join(0.1)
+            self.assertTrue(worker.is_alive())
+            self.assertTrue(client._submit_lock.acquire(blocking=False))
+            client._submit_lock.release()
+        finally:
+            client._inflight.release()
+            worker.join()
+
+        self.assertEqual(len(trader.calls), 1)
+        client._resolve_order_future(1, order_id=1001)
+        self.assertEqual(submitted[0].result(timeout=0), 1001)
+
+
+if __name__ == '__main__':
+    unittest.main()